@@ -0,0 +1,57 @@
+import argparse
+import time
+import numpy as np
+
+from ranking import RankingEngine, normalize_rows
+from ann_index import build_ivf_index, default_nprobe
+
+
+def synthetic_embeddings(n: int, dim: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """Unit vectors drawn around random topic centres, roughly like job-description embeddings."""
+    rng = np.random.default_rng(seed)
+    centres = normalize_rows(rng.standard_normal((clusters, dim)).astype(np.float32))
+    vectors = np.empty((n, dim), dtype=np.float32)
+    chunk = 100_000
+    for start in range(0, n, chunk):
+        size = min(chunk, n - start)
+        topic = rng.integers(0, clusters, size=size)
+        vectors[start:start + size] = centres[topic] + 0.6 * rng.standard_normal((size, dim)).astype(np.float32) / np.sqrt(dim)
+    return normalize_rows(vectors)
+
+
+def run(n: int, dim: int, k: int, queries: int, nprobes):
+    print(f"\n=== n={n:,} dim={dim} k={k} queries={queries} ===")
+    vectors = synthetic_embeddings(n, dim)
+    ids = [str(i) for i in range(n)]
+    query_vectors = synthetic_embeddings(queries, dim, seed=1)
+
+    exact = RankingEngine(ids, vectors, normalized=True)
+    start = time.perf_counter()
+    truth = [{row for row, _ in exact.search(q, k)} for q in query_vectors]
+    exact_ms = (time.perf_counter() - start) * 1000 / queries
+    print(f"exact        {exact_ms:8.2f} ms/query  recall@{k}=1.000")
+
+    start = time.perf_counter()
+    index = build_ivf_index(ids, vectors)
+    print(f"ivf build    {time.perf_counter() - start:8.2f} s  ({len(index.centroids)} lists)")
+
+    for nprobe in nprobes:
+        label = str(nprobe) if nprobe else f"auto ({index.nprobe or default_nprobe(len(index.centroids))})"
+        start = time.perf_counter()
+        found = [{int(key) for key, _ in index.search(q, k, nprobe=nprobe)} for q in query_vectors]
+        ivf_ms = (time.perf_counter() - start) * 1000 / queries
+        recall = np.mean([len(f & t) / len(t) for f, t in zip(found, truth)])
+        print(f"ivf nprobe={label:<9} {ivf_ms:8.2f} ms/query  recall@{k}={recall:.3f}  speedup={exact_ms / ivf_ms:5.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall@k and latency of the IVF job index against exact search.")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=128, help="use 768 to match gemini-embedding-2 (needs ~3 GB RAM per 1M vectors)")
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--nprobe", default="1,4,16,64,0", help="lists scanned per query; 0 is the default derived from nlist")
+    args = parser.parse_args()
+
+    for size in args.sizes.split(","):
+        run(int(size), args.dim, args.k, args.queries, [int(p) for p in args.nprobe.split(",")])
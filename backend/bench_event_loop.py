@@ -0,0 +1,265 @@
+import argparse
+import time
+import asyncio
+import numpy as np
+from typing import Optional
+
+from blocking_io import BLOCKING_IO_WORKERS
+
+
+def report(label: str, latencies_ms):
+    values = np.asarray(latencies_ms)
+    print(f"{label:<28} n={len(values):<5} p50={np.percentile(values, 50):8.2f} ms  p99={np.percentile(values, 99):8.2f} ms  max={values.max():8.2f} ms")
+
+
+async def probe_until(probe, done: asyncio.Event, interval: float):
+    latencies = []
+    while not done.is_set():
+        started = time.perf_counter()
+        await probe()
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def measure(probe, load, concurrency: int, requests: int, interval: float):
+    """Probe latencies while `requests` calls of load() run `concurrency` at a time."""
+    done = asyncio.Event()
+    prober = asyncio.create_task(probe_until(probe, done, interval))
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            await load()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    done.set()
+    return await prober
+
+
+async def idle(probe, interval: float, probes: int = 200):
+    return await measure(probe, lambda: asyncio.sleep(interval), 1, probes, interval)
+
+
+class _FakeSnapshot:
+    def __init__(self, doc_id: str, data: Optional[dict], reference):
+        self.id = doc_id
+        self.exists = data is not None
+        self.reference = reference
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class _FakeWrites:
+    """A write batch or transaction: each write applies to the store at once, one round trip each."""
+
+    def __init__(self, store: "FakeFirestore"):
+        self._store = store
+
+    def set(self, ref, data, merge=False):
+        self._store.write(ref.path, data, merge)
+
+    def update(self, ref, data, option=None):
+        self._store.write(ref.path, data, True)
+
+    def delete(self, ref):
+        self._store.round_trip()
+        self._store.documents.pop(ref.path, None)
+
+    def commit(self):
+        pass
+
+
+class _FakeQuery:
+    """Any query chain over an empty collection; stream() costs one round trip."""
+
+    def __init__(self, store: "FakeFirestore"):
+        self._store = store
+
+    def __getattr__(self, name):
+        if name in ("order_by", "where", "limit", "start_after", "select"):
+            return lambda *args, **kwargs: self
+        raise AttributeError(name)
+
+    def stream(self):
+        self._store.round_trip()
+        return iter(())
+
+
+class _FakeDocument(_FakeQuery):
+    def __init__(self, store: "FakeFirestore", path: str):
+        super().__init__(store)
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def get(self, field_paths=None, **kwargs):
+        self._store.round_trip()
+        return _FakeSnapshot(self.id, self._store.documents.get(self.path), self)
+
+    def collection(self, name: str):
+        return _FakeCollection(self._store, f"{self.path}/{name}")
+
+
+class _FakeCollection(_FakeQuery):
+    def __init__(self, store: "FakeFirestore", path: str):
+        super().__init__(store)
+        self.path = path
+
+    def document(self, doc_id: str):
+        return _FakeDocument(self._store, f"{self.path}/{doc_id}")
+
+
+class FakeFirestore:
+    """Stand-in for the synchronous Firestore client: every read or write blocks its thread for io_ms."""
+
+    def __init__(self, io_ms: float):
+        self.io_ms = io_ms
+        self.documents = {}
+
+    def round_trip(self):
+        time.sleep(self.io_ms / 1000)
+
+    def write(self, path: str, data: dict, merge: bool):
+        from firebase_admin import firestore
+
+        self.round_trip()
+        doc = dict(self.documents.get(path) or {}) if merge else {}
+        for key, value in data.items():
+            if value is firestore.DELETE_FIELD:
+                doc.pop(key, None)
+            else:
+                doc[key] = value
+        self.documents[path] = doc
+
+    def collection(self, name: str):
+        return _FakeCollection(self, name)
+
+    def get_all(self, refs, field_paths=None):
+        self.round_trip()
+        return [_FakeSnapshot(ref.id, self.documents.get(ref.path), ref) for ref in refs]
+
+    def batch(self):
+        return _FakeWrites(self)
+
+    def transaction(self):
+        return _FakeWrites(self)
+
+
+def seed_feed(store: FakeFirestore, uid: str, length: int):
+    """A user with a stored feed of `length` jobs, written by the real write_feed, and each job's card."""
+    from ranked_feed import write_feed
+
+    store.documents[f"users/{uid}"] = {"job_dict": {"title": "Engineer"}, "count": 0, "updated_at": 1}
+    feed = [{"id": f"job-{i}", "score": 1.0 - i / length} for i in range(length)]
+    for item in feed:
+        store.documents[f"resumes/{item['id']}"] = {"title": "Engineer", "company_name": "Acme", "location": "Remote"}
+    write_feed(store, uid, feed)
+
+
+def load_app(store: FakeFirestore):
+    """
+    Import the real server app with Firebase pointed at store: no credentials, no network,
+    and any bearer token is accepted as that uid. Firestore transactions run their body once
+    against the fake, without the client's begin/commit/retry wrapper. Adds /bench/me-inline
+    and /bench/feed-inline, /me and the feed (/save-profile) as they were written before
+    blocking calls moved to run_blocking, as the baselines.
+    """
+    import firebase_admin
+    from firebase_admin import auth, credentials, firestore
+
+    credentials.Certificate = lambda path: None
+    firebase_admin.initialize_app = lambda *args, **kwargs: None
+    firestore.client = lambda *args, **kwargs: store
+    auth.verify_id_token = lambda token, *args, **kwargs: {"uid": token, "email": None, "name": None}
+    import feed_cursor
+    feed_cursor._advance_in_transaction = feed_cursor._advance_in_transaction.to_wrap
+    import server
+
+    @server.app.get("/bench/me-inline")
+    async def me_inline(user: dict = server.Depends(server.get_current_user)):
+        doc = store.collection("users").document(user["uid"]).get()
+        return {"success": True, "data": doc.to_dict()}
+
+    @server.app.get("/bench/feed-inline")
+    async def feed_inline(user: dict = server.Depends(server.get_current_user)):
+        uid = user["uid"]
+        user_data = store.collection("users").document(uid).get().to_dict()
+        epoch = user_data.get("updated_at")
+        count = server.cursor_buffer.current(uid, user_data.get("count", 0), epoch)
+        current_batch = server.FeedReader(store, uid, user_data).slice(count, count + 5)
+        cards, _ = server.load_job_cards(store, [item["id"] for item in current_batch])
+        if current_batch:
+            server.cursor_buffer.advance(uid, count + len(current_batch), epoch, [item["id"] for item in current_batch])
+            server.cursor_buffer.flush(uid)
+        return {"success": True, "ranked_jobs": cards}
+
+    return server.app
+
+
+async def in_process(concurrency: int, requests: int, io_ms: float, interval: float):
+    """
+    The actual FastAPI app served in this event loop through httpx.ASGITransport, with every
+    Firestore read or write taking io_ms: /health probes while concurrent feed (/save-profile),
+    /me and /matches requests run. The feed requests page through a stored feed, hydrate
+    cards and flush the cursor, as a swiping user does.
+    """
+    import httpx
+
+    store = FakeFirestore(io_ms)
+    app = load_app(store)
+    io_ms, store.io_ms = store.io_ms, 0
+    seed_feed(store, "bench-user", 10 * requests + 5)  # room for both feed runs, 5 cards each
+    store.io_ms = io_ms
+    headers = {"Authorization": "Bearer bench-user"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=600) as client:
+        async def health():
+            (await client.get("/health")).raise_for_status()
+
+        def load(path):
+            async def call():
+                (await client.get(path, headers=headers)).raise_for_status()
+            return call
+
+        print(f"\n=== server.app in-process: {concurrency} concurrent requests x {requests}, {io_ms:g} ms per Firestore read, pool={BLOCKING_IO_WORKERS} ===")
+        report("/health idle", await idle(health, interval))
+        report("/health + /save-profile", await measure(health, load("/save-profile"), concurrency, requests, interval))
+        report("/health + inline feed", await measure(health, load("/bench/feed-inline"), concurrency, requests, interval))
+        report("/health + /me", await measure(health, load("/me"), concurrency, requests, interval))
+        report("/health + /matches", await measure(health, load("/matches"), concurrency, requests, interval))
+        report("/health + inline /me", await measure(health, load("/bench/me-inline"), concurrency, requests, interval))
+
+
+async def live(url: str, token: str, concurrency: int, requests: int, interval: float):
+    """Against a running server; each feed request advances the account's cursor, so use a test account."""
+    import httpx
+
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        async def health():
+            (await client.get("/health")).raise_for_status()
+
+        async def feed():
+            await client.get("/save-profile", headers={"Authorization": f"Bearer {token}"})
+
+        print(f"\n=== {url}: {concurrency} concurrent /save-profile x {requests} ===")
+        report("/health idle", await idle(health, interval))
+        report("/health under feed load", await measure(health, feed, concurrency, requests, interval))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="/health latency while concurrent feed requests run (event loop responsiveness).")
+    parser.add_argument("--url", help="running server, e.g. http://localhost:8000; omit to drive server.app in-process against a fake Firestore")
+    parser.add_argument("--token", help="Firebase ID token of a test account (with --url)")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--io-ms", type=float, default=20, help="blocking time of each fake Firestore read (in-process mode)")
+    parser.add_argument("--interval", type=float, default=0.01, help="seconds between /health probes")
+    args = parser.parse_args()
+
+    if args.url:
+        if not args.token:
+            parser.error("--url needs --token")
+        asyncio.run(live(args.url.rstrip("/"), args.token, args.concurrency, args.requests, args.interval))
+    else:
+        asyncio.run(in_process(args.concurrency, args.requests, args.io_ms, args.interval))
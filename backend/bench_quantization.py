@@ -0,0 +1,59 @@
+import sys
+import time
+import argparse
+import numpy as np
+
+from ranking import RankingEngine
+from quantization import QuantizedVectors
+from bench_ann import synthetic_embeddings
+
+
+def python_list_bytes(n: int, dim: int) -> int:
+    """Footprint of embeddings as load_job_database materialized them: a list of Python floats per job."""
+    row = [0.1 * i for i in range(dim)]
+    return n * (sys.getsizeof(row) + dim * sys.getsizeof(0.1))
+
+
+def run(n: int, dim: int, k: int, queries: int, rescore_factor: int):
+    print(f"\n=== n={n:,} dim={dim} k={k} queries={queries} rescore={rescore_factor}x ===")
+    vectors = synthetic_embeddings(n, dim)
+    ids = [str(i) for i in range(n)]
+    query_vectors = synthetic_embeddings(queries, dim, seed=1)
+
+    exact = RankingEngine(ids, vectors, normalized=True)
+    start = time.perf_counter()
+    truth = [{row for row, _ in exact.search(q, k)} for q in query_vectors]
+    exact_ms = (time.perf_counter() - start) * 1000 / queries
+
+    print(f"{'representation':<22}{'memory':>12}{'ms/query':>10}{'recall@' + str(k):>11}")
+    print(f"{'python lists':<22}{python_list_bytes(n, dim) / 2**20:>10.1f}MB{'-':>10}{'-':>11}")
+    print(f"{'float32':<22}{vectors.nbytes / 2**20:>10.1f}MB{exact_ms:>10.2f}{1.0:>11.3f}")
+
+    for kind in ("float16", "int8"):
+        coarse = QuantizedVectors.from_matrix(kind, vectors)
+
+        start = time.perf_counter()
+        found = [set(np.argpartition(-coarse.scores(q), k - 1)[:k].tolist()) for q in query_vectors]
+        coarse_ms = (time.perf_counter() - start) * 1000 / queries
+        recall = np.mean([len(f & t) / len(t) for f, t in zip(found, truth)])
+        print(f"{kind + ' only':<22}{coarse.nbytes / 2**20:>10.1f}MB{coarse_ms:>10.2f}{recall:>11.3f}")
+
+        engine = RankingEngine(ids, vectors, normalized=True, coarse=coarse, rescore_factor=rescore_factor)
+        start = time.perf_counter()
+        found = [{row for row, _ in engine.search(q, k)} for q in query_vectors]
+        rescored_ms = (time.perf_counter() - start) * 1000 / queries
+        recall = np.mean([len(f & t) / len(t) for f, t in zip(found, truth)])
+        print(f"{kind + ' + rescore':<22}{coarse.nbytes / 2**20:>10.1f}MB{rescored_ms:>10.2f}{recall:>11.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory, latency and recall of quantized job embeddings against float32.")
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--rescore", type=int, default=4)
+    args = parser.parse_args()
+
+    for size in args.sizes.split(","):
+        run(int(size), args.dim, args.k, args.queries, args.rescore)
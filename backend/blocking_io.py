@@ -0,0 +1,30 @@
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+
+# Firestore, Gemini and OCR clients are synchronous. Async handlers hand those calls to this
+# bounded pool so the event loop keeps serving /health and every open socket meanwhile;
+# past BLOCKING_IO_WORKERS concurrent calls, further calls queue rather than adding threads.
+BLOCKING_IO_WORKERS = int(os.getenv("BLOCKING_IO_WORKERS", "32"))
+_executor = ThreadPoolExecutor(max_workers=BLOCKING_IO_WORKERS, thread_name_prefix="blocking-io")
+_DONE = object()
+
+
+async def run_blocking(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run a synchronous call on the blocking-I/O pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+async def iterate_blocking(iterable: Iterable[T]) -> AsyncIterator[T]:
+    """Consume a blocking iterator (e.g. a streamed Gemini response) one item per pool call."""
+    iterator = await run_blocking(iter, iterable)
+    while True:
+        item = await run_blocking(next, iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item
@@ -0,0 +1,122 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Callable, Optional, Tuple
+
+from job_cards import load_feed_cards
+from ranked_feed import FeedReader
+from blocking_io import run_blocking
+
+# Cards /ws/jobs keeps ready ahead of the user; a refill starts once the buffer is half empty.
+PREFETCH_DEPTH = int(os.getenv("WS_PREFETCH_DEPTH", "10"))
+
+
+class PrefetchMetrics:
+    """Process-wide counters for /ws/jobs: an underrun is a NEXT_JOB that had to wait for Firestore."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.served = 0
+        self.underruns = 0
+        self.underrun_wait = 0.0
+        self.refills = 0
+
+    def record(self, waited: Optional[float]):
+        with self._lock:
+            self.served += 1
+            if waited is not None:
+                self.underruns += 1
+                self.underrun_wait += waited
+
+    def record_refill(self):
+        with self._lock:
+            self.refills += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "depth": PREFETCH_DEPTH,
+                "served": self.served,
+                "refills": self.refills,
+                "underruns": self.underruns,
+                "underrun_rate": self.underruns / self.served if self.served else 0.0,
+                "avg_underrun_ms": 1000 * self.underrun_wait / self.underruns if self.underruns else 0.0,
+            }
+
+
+prefetch_metrics = PrefetchMetrics()
+
+
+class CardPrefetcher:
+    """
+    Look-ahead buffer of (feed position, card) pairs for one swipe socket. Cards are fetched
+    in batches on a worker thread while the user swipes, so next() is normally answered from
+    memory. reload_feed is called when the feed was re-ranked and its old pages are gone.
+    """
+
+    def __init__(self, db, feed: FeedReader, start: int, reload_feed: Callable[[], FeedReader], depth: int = PREFETCH_DEPTH):
+        self.db = db
+        self.feed = feed
+        self.reload_feed = reload_feed
+        self.depth = max(1, depth)
+        self._buffer: deque = deque()
+        self._next = start  # first feed position not yet fetched
+        self._refill: Optional[asyncio.Task] = None
+        self._exhausted = False
+
+    def start(self):
+        self._schedule()
+
+    def _schedule(self):
+        if self._exhausted or (self._refill is not None and not self._refill.done()):
+            return
+        if len(self._buffer) <= self.depth // 2:
+            self._refill = asyncio.create_task(self._fill())
+
+    async def _fill(self):
+        want = self.depth - len(self._buffer)
+        cards, scanned = await run_blocking(self._fetch, self._next, want)
+        prefetch_metrics.record_refill()
+        self._buffer.extend(cards)
+        self._next += scanned
+        if not scanned:
+            self._exhausted = True
+
+    def _fetch(self, start: int, size: int) -> Tuple[list, int]:
+        """Fetch at least one card (skipping deleted jobs) unless the feed is exhausted; returns (cards, positions scanned)."""
+        position = start
+        while position < len(self.feed):
+            cards, missing = load_feed_cards(self.db, self.feed, position, size)
+            if not cards and not missing:
+                # Feed was re-ranked since connect and the old pages are gone; follow the new one
+                self.feed = self.reload_feed()
+                cards, missing = load_feed_cards(self.db, self.feed, position, size)
+                if not cards and not missing:
+                    break
+            if missing:
+                print(f"DEBUG: Job IDs {missing} not found in 'resumes' collection.")
+            position = min(position + size, len(self.feed))
+            if cards:
+                return cards, position - start
+        return [], position - start
+
+    async def next(self) -> Optional[Tuple[int, dict]]:
+        """The next (feed position, card), or None once the feed is exhausted."""
+        waited = None
+        while not self._buffer and not self._exhausted:
+            started = time.perf_counter()
+            self._schedule()
+            await self._refill
+            waited = (waited or 0.0) + time.perf_counter() - started
+        if not self._buffer:
+            return None
+        item = self._buffer.popleft()
+        prefetch_metrics.record(waited)
+        self._schedule()
+        return item
+
+    def close(self):
+        if self._refill is not None and not self._refill.done():
+            self._refill.cancel()
@@ -0,0 +1,150 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from firebase_admin import firestore
+
+from seen_jobs import LEGACY_SEEN_FIELD, SEEN_FIELD, add_seen, merge_seen, seen_ref
+
+# A user's feed cursor ("count" on users/{uid}) is buffered in memory and written at most
+# every CURSOR_FLUSH_SWIPES advances or CURSOR_FLUSH_SECONDS, and when a socket closes.
+CURSOR_FLUSH_SWIPES = int(os.getenv("CURSOR_FLUSH_SWIPES", "10"))
+CURSOR_FLUSH_SECONDS = float(os.getenv("CURSOR_FLUSH_SECONDS", "5"))
+
+
+@firestore.transactional
+def _advance_in_transaction(transaction, user_ref, seen_doc, position: int, epoch, writes=(), seen=()) -> bool:
+    fields = ["count", "updated_at", LEGACY_SEEN_FIELD] if seen else ["count", "updated_at"]
+    snapshot = user_ref.get(field_paths=fields, transaction=transaction)
+    stored = seen_doc.get(transaction=transaction) if seen else None  # reads come before writes
+    for ref, data in writes:
+        transaction.set(ref, data)
+    if not snapshot.exists:
+        return False
+    data = snapshot.to_dict()
+    update = {}
+    # Seen jobs stay seen across feeds, so they are recorded whatever happens to the cursor;
+    # the seen document is only rewritten when the set actually grows
+    if seen:
+        blob = stored.to_dict().get(SEEN_FIELD) if stored.exists else None
+        legacy = data.get(LEGACY_SEEN_FIELD)
+        updated = add_seen(merge_seen(blob, legacy), seen)
+        if updated != (blob or b""):
+            transaction.set(seen_doc, {SEEN_FIELD: updated, "updated_at": firestore.SERVER_TIMESTAMP})
+        if legacy is not None:
+            update[LEGACY_SEEN_FIELD] = firestore.DELETE_FIELD
+    # updated_at changes when a new resume resets the feed; a cursor from the old feed is dropped
+    advanced = data.get("updated_at") == epoch and position > data.get("count", 0)
+    if advanced:
+        update["count"] = position
+    if update:
+        transaction.update(user_ref, update)
+    return advanced
+
+
+def advance_cursor(db, uid: str, position: int, epoch, writes=(), seen=()) -> bool:
+    """
+    Atomically move the stored cursor forward to position; never moves it backwards.
+    writes, (document reference, data) pairs, are set and the job ids in seen are added to
+    the user's seen set in the same commit either way.
+    """
+    return _advance_in_transaction(db.transaction(), db.collection("users").document(uid), seen_ref(db, uid), position, epoch, list(writes), list(seen))
+
+
+class _Pending:
+    def __init__(self, position: int, epoch):
+        self.position = position
+        self.epoch = epoch
+        self.advances = 0
+        self.seen = []  # job ids served since the last flush
+
+
+class CursorBuffer:
+    """
+    Write-behind buffer of feed cursors. advance() only updates memory; flushes coalesce all
+    advances since the last one into a single monotonic transaction per user. current()
+    overlays unflushed positions so this process always reads its own writes.
+    """
+
+    def __init__(self, get_db: Callable, flush_swipes: int = CURSOR_FLUSH_SWIPES, flush_seconds: float = CURSOR_FLUSH_SECONDS):
+        self.get_db = get_db
+        self.flush_swipes = flush_swipes
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._pending: Dict[str, _Pending] = {}
+        self._inflight: Dict[str, _Pending] = {}  # taken by a flush that has not committed yet
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cursor")
+        self._stop = threading.Event()
+        self._timer: Optional[threading.Thread] = None
+        self.flushes = 0
+        self.advances = 0
+
+    def _ensure_timer(self):
+        if self._timer is None:
+            self._timer = threading.Thread(target=self._run_timer, name="cursor-flush", daemon=True)
+            self._timer.start()
+
+    def _run_timer(self):
+        while not self._stop.wait(self.flush_seconds):
+            self.flush_all()
+
+    def advance(self, uid: str, position: int, epoch, job_ids=()):
+        with self._lock:
+            self._ensure_timer()
+            self.advances += 1
+            pending = self._pending.get(uid)
+            if pending is None or pending.epoch != epoch:
+                carried = pending.seen if pending is not None else []
+                pending = self._pending[uid] = _Pending(position, epoch)
+                pending.seen = carried
+            pending.position = max(pending.position, position)
+            pending.seen.extend(job_ids)
+            pending.advances += 1
+            due = pending.advances >= self.flush_swipes
+        if due:
+            self._pool.submit(self.flush, uid)
+
+    def current(self, uid: str, stored: int, epoch) -> int:
+        """The cursor to serve from: the stored count, or a later unflushed position for the same feed."""
+        with self._lock:
+            for pending in (self._pending.get(uid), self._inflight.get(uid)):
+                if pending is not None and pending.epoch == epoch:
+                    stored = max(stored, pending.position)
+        return stored
+
+    def _take(self, uid: str) -> Optional[_Pending]:
+        with self._lock:
+            pending = self._pending.pop(uid, None)
+            if pending is not None:
+                self._inflight[uid] = pending
+            return pending
+
+    def flush(self, uid: str):
+        pending = self._take(uid)
+        if pending is None:
+            return
+        try:
+            advance_cursor(self.get_db(), uid, pending.position, pending.epoch, seen=pending.seen)
+            self.flushes += 1
+        except Exception as e:
+            print(f"Cursor flush failed for {uid}: {e}")
+            # Put it back (the position only if no newer feed took over) so the next flush retries it
+            with self._lock:
+                current = self._pending.setdefault(uid, _Pending(pending.position, pending.epoch))
+                if current.epoch == pending.epoch:
+                    current.position = max(current.position, pending.position)
+                current.seen[:0] = pending.seen
+        finally:
+            with self._lock:
+                if self._inflight.get(uid) is pending:
+                    del self._inflight[uid]
+
+    def flush_all(self):
+        with self._lock:
+            uids = list(self._pending)
+        for uid in uids:
+            self.flush(uid)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"pending": len(self._pending), "advances": self.advances, "flushes": self.flushes}
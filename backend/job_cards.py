@@ -0,0 +1,240 @@
+import os
+import time
+import datetime
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+from firebase_admin import firestore
+
+# The fields a job card shows. On a "resumes" document, description is a preview of at most
+# DESCRIPTION_PREVIEW_LENGTH characters; description_truncated says the full text is in DETAILS_COLLECTION.
+CARD_FIELDS = ["apply_options", "company_name", "description", "description_truncated", "detected_extensions", "extensions", "job_highlights", "location", "title"]
+# What the cache keeps per job: the card plus what chat and auto-apply read.
+CACHED_FIELDS = CARD_FIELDS + ["share_link", "expiry_date"]
+# Documents per get_all call; a feed page or a matches page fits in one.
+GET_ALL_CHUNK = 100
+
+JOB_CARD_CACHE_SIZE = int(os.getenv("JOB_CARD_CACHE_SIZE", "5000"))
+# Lifetime for jobs without an expiry_date; jobs with one are never served past it.
+JOB_CARD_CACHE_TTL = int(os.getenv("JOB_CARD_CACHE_TTL", "3600"))
+# cron/deletion.py logs deleted ids here; caches pick them up at most this often.
+INVALIDATION_COLLECTION = "job_invalidations"
+INVALIDATION_POLL_SECONDS = int(os.getenv("JOB_CARD_INVALIDATION_POLL", "60"))
+
+# A job is stored as three documents under the same id: the slim card in "resumes", the full
+# description in DETAILS_COLLECTION (read only when a user opens the job or chats about it),
+# and the embedding and minhash in VECTORS_COLLECTION (read only by the job index and ingestion).
+DETAILS_COLLECTION = "job_details"
+VECTORS_COLLECTION = "job_vectors"
+DESCRIPTION_PREVIEW_LENGTH = int(os.getenv("JOB_DESCRIPTION_PREVIEW", "400"))
+VECTOR_FIELDS = ("embedding", "minhash")
+
+
+def split_job(payload: dict) -> Tuple[dict, dict, dict]:
+    """Split a full job payload into its (card, details, vectors) documents."""
+    description = payload.get("description") or ""
+    card = {key: value for key, value in payload.items() if key not in VECTOR_FIELDS}
+    card["description"] = description[:DESCRIPTION_PREVIEW_LENGTH]
+    card["description_truncated"] = len(description) > DESCRIPTION_PREVIEW_LENGTH
+    details = {"description": description}
+    vectors = {key: payload[key] for key in VECTOR_FIELDS if key in payload}
+    return card, details, vectors
+
+
+def write_job(batch, db, doc_id: str, payload: dict):
+    """Stage the card, details and vectors documents of one job on a write batch."""
+    card, details, vectors = split_job(payload)
+    batch.set(db.collection(DETAILS_COLLECTION).document(doc_id), details)
+    batch.set(db.collection(VECTORS_COLLECTION).document(doc_id), vectors, merge=True)
+    batch.set(db.collection("resumes").document(doc_id), card)
+
+
+def delete_job(batch, db, doc_id: str):
+    for collection in ("resumes", DETAILS_COLLECTION, VECTORS_COLLECTION):
+        batch.delete(db.collection(collection).document(doc_id))
+
+
+def load_job_vectors(db, job_ids: Sequence[str], fields: Sequence[str] = VECTOR_FIELDS) -> Dict[str, dict]:
+    """VECTORS_COLLECTION entries for job_ids, one get_all per GET_ALL_CHUNK ids."""
+    vectors = db.collection(VECTORS_COLLECTION)
+    found: Dict[str, dict] = {}
+    job_ids = list(job_ids)
+    for start in range(0, len(job_ids), GET_ALL_CHUNK):
+        refs = [vectors.document(job_id) for job_id in job_ids[start:start + GET_ALL_CHUNK]]
+        for doc in db.get_all(refs, field_paths=list(fields)):
+            if doc.exists:
+                found[doc.id] = doc.to_dict()
+    return found
+
+
+def load_description(db, job_id: str, card: Optional[dict] = None) -> Optional[str]:
+    """
+    Full description of a job. Jobs stored before the card/details split keep it on the card,
+    so a card without description_truncated is already complete.
+    """
+    if card is not None and not card.get("description_truncated"):
+        return card.get("description", "")
+    doc = db.collection(DETAILS_COLLECTION).document(job_id).get()
+    if doc.exists:
+        return doc.to_dict().get("description", "")
+    if card is None:
+        card = job_card_cache.get(db, job_id)
+        if card is not None and not card.get("description_truncated"):
+            return card.get("description", "")
+    return None
+
+
+def to_card(job_id: str, data: dict) -> dict:
+    card = {key: data.get(key, "") for key in CARD_FIELDS}
+    card["description_truncated"] = bool(data.get("description_truncated"))
+    card["id"] = job_id
+    return card
+
+
+class JobCardCache:
+    """
+    Process-wide LRU of projected "resumes" documents. Jobs are immutable between ingestion
+    and deletion, so entries are only dropped by LRU eviction, by reaching the job's
+    expiry_date (or the TTL for jobs without one), or by ids the deletion cron logged.
+    """
+
+    def __init__(self, max_entries: int = JOB_CARD_CACHE_SIZE, ttl: float = JOB_CARD_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._polled_at = time.monotonic()
+        self._invalidated_through = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=1)
+
+    def _deadline(self, data: dict) -> float:
+        deadline = time.time() + self.ttl
+        expiry = data.get("expiry_date")
+        if isinstance(expiry, datetime.datetime):
+            if expiry.tzinfo is None:
+                expiry = expiry.replace(tzinfo=datetime.timezone.utc)
+            deadline = min(deadline, expiry.timestamp())
+        return deadline
+
+    def _lookup(self, job_id: str, now: float) -> Optional[dict]:
+        entry = self._entries.get(job_id)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._entries[job_id]
+            return None
+        self._entries.move_to_end(job_id)
+        return entry[1]
+
+    def _store(self, job_id: str, data: dict):
+        self._entries[job_id] = (self._deadline(data), data)
+        self._entries.move_to_end(job_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_many(self, db, job_ids: Sequence[str]) -> Dict[str, dict]:
+        """Projected documents for job_ids (absent ids have no document); misses cost one get_all per chunk."""
+        self._poll_invalidations(db)
+        found: Dict[str, dict] = {}
+        wanted = []
+        now = time.time()
+        with self._lock:
+            for job_id in dict.fromkeys(job_ids):
+                data = self._lookup(job_id, now)
+                if data is not None:
+                    found[job_id] = data
+                    self.hits += 1
+                else:
+                    wanted.append(job_id)
+                    self.misses += 1
+
+        jobs = db.collection("resumes")
+        for start in range(0, len(wanted), GET_ALL_CHUNK):
+            refs = [jobs.document(job_id) for job_id in wanted[start:start + GET_ALL_CHUNK]]
+            for doc in db.get_all(refs, field_paths=CACHED_FIELDS):
+                if doc.exists:
+                    found[doc.id] = doc.to_dict()
+            with self._lock:
+                for ref in refs:
+                    if ref.id in found:
+                        self._store(ref.id, found[ref.id])
+        return found
+
+    def get(self, db, job_id: str) -> Optional[dict]:
+        return self.get_many(db, [job_id]).get(job_id)
+
+    def invalidate(self, job_ids: Sequence[str]):
+        with self._lock:
+            for job_id in job_ids:
+                if self._entries.pop(job_id, None) is not None:
+                    self.invalidations += 1
+
+    def _poll_invalidations(self, db):
+        if time.monotonic() - self._polled_at < INVALIDATION_POLL_SECONDS:
+            return
+        self._polled_at = time.monotonic()
+        try:
+            query = db.collection(INVALIDATION_COLLECTION).where("deleted_at", ">", self._invalidated_through)
+            for doc in query.stream():
+                data = doc.to_dict()
+                self.invalidate(data.get("job_ids", []))
+                deleted_at = data.get("deleted_at")
+                if isinstance(deleted_at, datetime.datetime) and deleted_at > self._invalidated_through:
+                    self._invalidated_through = deleted_at
+        except Exception as e:
+            print(f"Job card cache: could not read invalidations: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+job_card_cache = JobCardCache()
+
+
+def load_job_cards(db, job_ids: Sequence[str], cache: Optional[JobCardCache] = None) -> Tuple[List[dict], List[str]]:
+    """
+    Cards for job_ids, served from the card cache with one batched get_all (per GET_ALL_CHUNK
+    ids) for the misses. Returns (cards in the order of job_ids, ids with no document).
+    """
+    found = (cache or job_card_cache).get_many(db, job_ids)
+    cards = [to_card(job_id, found[job_id]) for job_id in job_ids if job_id in found]
+    missing = [job_id for job_id in dict.fromkeys(job_ids) if job_id not in found]
+    return cards, missing
+
+
+def load_feed_cards(db, feed, start: int, size: int) -> Tuple[List[Tuple[int, dict]], List[str]]:
+    """
+    Cards for feed entries [start, start + size) in one batched read, as (feed position, card)
+    pairs carrying the ranking score, plus the ids that no longer have a document.
+    """
+    items = feed.slice(start, start + size)
+    cards, missing = load_job_cards(db, [item["id"] for item in items])
+    by_id = {card["id"]: card for card in cards}
+    positioned = []
+    for offset, item in enumerate(items):
+        card = by_id.get(item["id"])
+        if card is not None:
+            positioned.append((start + offset, {**card, "score": item["score"]}))
+    return positioned, missing
+
+
+def log_deleted_jobs(db, job_ids: Sequence[str], chunk: int = 5000):
+    """Record deleted job ids so every server's card cache drops them on its next poll."""
+    for start in range(0, len(job_ids), chunk):
+        db.collection(INVALIDATION_COLLECTION).add({
+            "job_ids": list(job_ids[start:start + chunk]),
+            "deleted_at": firestore.SERVER_TIMESTAMP,
+        })
@@ -0,0 +1,119 @@
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from ranking import RankingEngine
+
+# Filters a user can set. Values within one attribute are OR-ed, attributes are AND-ed.
+FILTER_KEYS = ("remote", "schedule_types", "locations")
+REMOTE_LOCATIONS = {"anywhere", "remote", "work from home"}
+_SPLIT = re.compile(r"\s*[,/()]\s*")
+
+
+def _normalize(value: str) -> str:
+    return " ".join(str(value).lower().split())
+
+
+def location_terms(location: str) -> List[str]:
+    """Full location plus its comma-separated parts, e.g. "Austin, TX" -> ["austin, tx", "austin", "tx"]."""
+    location = _normalize(location or "")
+    if not location:
+        return []
+    return [location] + [part for part in _SPLIT.split(location) if part and part != location]
+
+
+def is_remote(job: dict) -> bool:
+    detected = job.get("detected_extensions") or {}
+    if isinstance(detected, dict) and detected.get("work_from_home"):
+        return True
+    if _normalize(job.get("location") or "") in REMOTE_LOCATIONS:
+        return True
+    return any(_normalize(ext) in ("work from home", "remote") for ext in (job.get("extensions") or []) if isinstance(ext, str))
+
+
+def schedule_type(job: dict) -> Optional[str]:
+    detected = job.get("detected_extensions") or {}
+    value = detected.get("schedule_type") if isinstance(detected, dict) else None
+    return _normalize(value) if value else None
+
+
+def normalize_filters(filters: Optional[dict]) -> dict:
+    """Drop unknown keys and empty values; lowercase list values. Returns {} for no filtering."""
+    clean = {}
+    for key, value in (filters or {}).items():
+        if key not in FILTER_KEYS or value is None:
+            continue
+        if key == "remote":
+            clean[key] = bool(value)
+        else:
+            values = sorted({_normalize(v) for v in value if str(v).strip()})
+            if values:
+                clean[key] = values
+    return clean
+
+
+class AttributeBitmaps:
+    """
+    Packed per-value bitmaps over the rows of a ranking engine (one bit per job), built once
+    per snapshot so a filter resolves to candidate rows with a few bitwise ops.
+    """
+
+    def __init__(self, metadata: List[dict]):
+        self.size = len(metadata)
+        rows: Dict[str, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+        for row, job in enumerate(metadata):
+            rows["remote"][str(is_remote(job))].append(row)
+            schedule = schedule_type(job)
+            if schedule:
+                rows["schedule_types"][schedule].append(row)
+            for term in location_terms(job.get("location")):
+                rows["locations"][term].append(row)
+        self.bitmaps = {attribute: {value: self._pack(members) for value, members in values.items()} for attribute, values in rows.items()}
+        self._empty = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def _pack(self, members: Iterable[int]) -> np.ndarray:
+        bits = np.zeros(self.size, dtype=bool)
+        bits[list(members)] = True
+        return np.packbits(bits)
+
+    def _any_of(self, attribute: str, values: Iterable[str]) -> np.ndarray:
+        mask = self._empty.copy()
+        for value in values:
+            bitmap = self.bitmaps.get(attribute, {}).get(value)
+            if bitmap is not None:
+                mask |= bitmap
+        return mask
+
+    def rows(self, filters: dict) -> Optional[np.ndarray]:
+        """Row indices matching every filter, or None when no filter applies."""
+        filters = normalize_filters(filters)
+        if not filters:
+            return None
+        mask = ~self._empty
+        if "remote" in filters:
+            mask &= self._any_of("remote", [str(filters["remote"])])
+        if "schedule_types" in filters:
+            mask &= self._any_of("schedule_types", filters["schedule_types"])
+        if "locations" in filters:
+            mask &= self._any_of("locations", filters["locations"])
+        return np.flatnonzero(np.unpackbits(mask, count=self.size))
+
+
+def bitmaps_for(engine: RankingEngine) -> AttributeBitmaps:
+    """Bitmaps for an engine, built on first use and cached on it."""
+    if engine.bitmaps is None:
+        engine.bitmaps = AttributeBitmaps(engine.metadata)
+    return engine.bitmaps
+
+
+def filtered_rows(engine: RankingEngine, filters: Optional[dict]) -> Optional[np.ndarray]:
+    return bitmaps_for(engine).rows(filters) if normalize_filters(filters) else None
+
+
+def filters_from_params(remote: Optional[bool] = None, schedule_types: Optional[List[str]] = None, locations: Optional[List[str]] = None) -> Optional[dict]:
+    """Filters from request parameters, or None when the request does not set any."""
+    if remote is None and not schedule_types and not locations:
+        return None
+    return normalize_filters({"remote": remote, "schedule_types": schedule_types, "locations": locations})
@@ -0,0 +1,305 @@
+import os
+import json
+import time
+import uuid
+import datetime
+import threading
+import numpy as np
+from typing import Dict, List, Optional
+
+from ranking import RankingEngine, merge_feed, normalize_rows
+from ann_index import IVFIndex, build_ivf_index
+from quantization import QUANTIZATION, RESCORE_FACTOR, QuantizedVectors
+from job_filters import AttributeBitmaps
+from job_cards import load_job_vectors
+
+# Fields copied from each "resumes" document into the sidecar. The full description
+# and the raw embedding list never leave Firestore after the first sync.
+SNAPSHOT_FIELDS = ("title", "company_name", "location", "share_link", "tags", "extensions", "detected_extensions")
+# What a sync reads from each card; "embedding" is only present on jobs stored before vectors moved to job_vectors.
+SYNC_FIELDS = list(SNAPSHOT_FIELDS) + ["description", "added_at", "expiry_date", "is_canonical", "embedding"]
+SNIPPET_LENGTH = 300
+SYNC_INTERVAL_SECONDS = int(os.getenv("JOB_SNAPSHOT_SYNC_INTERVAL", "300"))
+# Incremental syncs only see new documents; a periodic full rebuild picks up any other edits.
+REBUILD_INTERVAL_SECONDS = int(os.getenv("JOB_SNAPSHOT_REBUILD_INTERVAL", str(24 * 3600)))
+META_FILE = "meta.json"
+# "exact" scores every job; "ivf" routes search through an approximate IVF index kept in memory.
+INDEX_TYPE = os.getenv("JOB_INDEX", "exact").lower()
+
+
+def _to_iso(value) -> Optional[str]:
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return value.isoformat()
+    return None
+
+
+def _from_iso(value: Optional[str]) -> Optional[datetime.datetime]:
+    return datetime.datetime.fromisoformat(value) if value else None
+
+
+def job_metadata(doc_id: str, data: dict) -> dict:
+    """Project a Firestore job document onto the fields the snapshot keeps."""
+    meta = {key: data.get(key) for key in SNAPSHOT_FIELDS if key in data}
+    meta["id"] = doc_id
+    meta["description"] = (data.get("description") or "")[:SNIPPET_LENGTH]
+    meta["added_at"] = _to_iso(data.get("added_at"))
+    meta["expiry_date"] = _to_iso(data.get("expiry_date"))
+    return meta
+
+
+def added_timestamps(engine: RankingEngine) -> np.ndarray:
+    """POSIX added_at per row (-inf where unknown), for repeated rows_added_after calls."""
+    stamps = np.full(len(engine), -np.inf)
+    for row, job in enumerate(engine.metadata):
+        added_at = _from_iso(job.get("added_at"))
+        if added_at is not None:
+            stamps[row] = added_at.timestamp()
+    return stamps
+
+
+def rows_added_after(engine: RankingEngine, since: Optional[datetime.datetime], stamps: Optional[np.ndarray] = None) -> List[int]:
+    """Rows of jobs whose added_at is later than since (all rows if since is None)."""
+    if since is None:
+        return list(range(len(engine)))
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=datetime.timezone.utc)
+    stamps = added_timestamps(engine) if stamps is None else stamps
+    return np.nonzero(stamps > since.timestamp())[0].tolist()
+
+
+def incremental_feed(
+    engine: RankingEngine,
+    query,
+    previous: List[dict],
+    count: int,
+    allowed: Optional[np.ndarray],
+    seen: Optional[np.ndarray],
+    ranked_through: datetime.datetime,
+    stamps: Optional[np.ndarray] = None,
+) -> List[dict]:
+    """
+    A stored feed with the jobs added after ranked_through merged in. Only those rows are
+    scored, minus the ones outside allowed (the user's filters) or in seen.
+    """
+    rows = rows_added_after(engine, ranked_through, stamps)
+    if allowed is not None:
+        rows = np.intersect1d(rows, allowed)
+    if seen is not None:
+        rows = np.setdiff1d(rows, seen)
+    return merge_feed(engine, previous, count, engine.search_rows(query, rows))
+
+
+def feed_behind(user_data: dict, engine: Optional[RankingEngine]) -> bool:
+    """True if engine holds jobs synced after the user's feed was last ranked."""
+    ranked_through = user_data.get("ranked_through")
+    synced_through = engine.synced_through if engine is not None else None
+    return ranked_through is not None and synced_through is not None and ranked_through < synced_through
+
+
+class JobSnapshot:
+    """
+    On-disk snapshot of the "resumes" collection: a normalized float32 .npy matrix opened
+    with mmap plus a JSON sidecar holding ids, card metadata and the sync watermark.
+    meta.json is replaced atomically and names the matrix file, so readers never see a
+    half-written snapshot.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.meta_path = os.path.join(directory, META_FILE)
+        self._lock = threading.Lock()
+        self._engine: Optional[RankingEngine] = None
+        self._meta: Optional[dict] = None
+        self._synced_at = 0.0
+        self._index: Optional[IVFIndex] = None
+
+    def load(self) -> Optional[RankingEngine]:
+        """Open the snapshot currently on disk, or return None if there is none."""
+        if not os.path.exists(self.meta_path):
+            return None
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        matrix_path = os.path.join(self.directory, meta["matrix_file"])
+        if not os.path.exists(matrix_path):
+            return None
+        matrix = np.load(matrix_path, mmap_mode="r")
+        if matrix.shape[0] != len(meta["jobs"]):
+            print(f"Job snapshot at {self.directory} is inconsistent; ignoring it.")
+            return None
+        self._meta = meta
+        engine = RankingEngine([job["id"] for job in meta["jobs"]], matrix, meta["jobs"], normalized=True, rescore_factor=RESCORE_FACTOR)
+        engine.coarse = self._load_quantized(meta, matrix)
+        engine.bitmaps = AttributeBitmaps(meta["jobs"])
+        engine.synced_through = _from_iso(meta.get("synced_through"))
+        return engine
+
+    def _load_quantized(self, meta: dict, matrix: np.ndarray) -> Optional[QuantizedVectors]:
+        """Open (or, for snapshots written without one, build) the quantized copy of the matrix."""
+        if QUANTIZATION == "none":
+            return None
+        files = meta.get("quantized", {}).get(QUANTIZATION)
+        if not files:
+            return QuantizedVectors.from_matrix(QUANTIZATION, matrix)
+        codes = np.load(os.path.join(self.directory, files["codes"]), mmap_mode="r")
+        scales = np.load(os.path.join(self.directory, files["scales"]), mmap_mode="r") if files.get("scales") else None
+        return QuantizedVectors(QUANTIZATION, codes, scales)
+
+    def engine(self, db, max_age: float = SYNC_INTERVAL_SECONDS) -> RankingEngine:
+        """Return a ranking engine, syncing from Firestore when the snapshot is older than max_age."""
+        with self._lock:
+            if self._engine is None:
+                self._engine = self.load()
+            if self._engine is None or time.monotonic() - self._synced_at >= max_age:
+                self._engine = self._sync(db)
+                self._synced_at = time.monotonic()
+            return self._engine
+
+    def current(self) -> Optional[RankingEngine]:
+        """The engine this process has loaded, if any, without loading or syncing one."""
+        return self._engine
+
+    def sync(self, db) -> RankingEngine:
+        with self._lock:
+            if self._engine is None:
+                self._engine = self.load()
+            self._engine = self._sync(db)
+            self._synced_at = time.monotonic()
+            return self._engine
+
+    def _sync(self, db) -> RankingEngine:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        current = self._engine
+        built_at = _from_iso(self._meta.get("built_at")) if self._meta else None
+        if built_at is None or (now - built_at).total_seconds() >= REBUILD_INTERVAL_SECONDS:
+            current = None
+            built_at = now
+        watermark = _from_iso(self._meta.get("synced_through")) if current is not None and self._meta else None
+
+        # Incremental: only documents cron/addition.py wrote after the last sync.
+        query = db.collection("resumes")
+        if watermark is not None:
+            query = query.where("added_at", ">", watermark)
+
+        candidates = []
+        latest = watermark
+        for doc in query.select(SYNC_FIELDS).stream():
+            data = doc.to_dict()
+            added_at = data.get("added_at")
+            if isinstance(added_at, datetime.datetime) and (latest is None or added_at > latest):
+                latest = added_at
+            expiry = data.get("expiry_date")
+            if isinstance(expiry, datetime.datetime) and expiry < now:
+                continue
+            # Near-duplicates found at ingestion stay out of the index; only each cluster's canonical job is ranked
+            if data.get("is_canonical") is False:
+                continue
+            candidates.append((doc.id, data))
+
+        vectors = load_job_vectors(db, [doc_id for doc_id, data in candidates if not data.get("embedding")], ["embedding"])
+        new_ids: List[str] = []
+        new_meta: List[dict] = []
+        new_rows: List[list] = []
+        for doc_id, data in candidates:
+            embedding = data.get("embedding") or vectors.get(doc_id, {}).get("embedding")
+            if not embedding:
+                continue
+            new_ids.append(doc_id)
+            new_meta.append(job_metadata(doc_id, data))
+            new_rows.append(embedding)
+
+        # Keep existing rows that have not expired and are not superseded by a fresh copy.
+        replaced = set(new_ids)
+        keep: List[int] = []
+        if current is not None:
+            for row, job in enumerate(current.metadata):
+                expiry = _from_iso(job.get("expiry_date"))
+                if job["id"] in replaced or (expiry is not None and expiry < now):
+                    continue
+                keep.append(row)
+
+        dropped = len(current) - len(keep) if current is not None else 0
+        if current is not None and not new_ids and not dropped:
+            return self._attach_index(current) if current.index is None else current
+
+        dim = current.dim if current is not None and len(current) else (len(new_rows[0]) if new_rows else 0)
+        fresh = np.asarray([row for row in new_rows if len(row) == dim], dtype=np.float32).reshape(-1, dim)
+        fresh_meta = [meta for meta, row in zip(new_meta, new_rows) if len(row) == dim]
+        kept_matrix = np.asarray(current.matrix[keep], dtype=np.float32) if current is not None else np.empty((0, dim), dtype=np.float32)
+        matrix = np.concatenate([kept_matrix, normalize_rows(fresh)]) if len(fresh) else kept_matrix
+        jobs = ([current.metadata[row] for row in keep] if current is not None else []) + fresh_meta
+
+        self._write(matrix, jobs, latest, built_at)
+        print(f"Job snapshot synced: +{len(fresh_meta)} new, -{dropped} expired/replaced, {len(jobs)} total")
+        kept_ids = {current.ids[row] for row in keep} if current is not None else set()
+        removed = [job_id for job_id in (current.ids if current is not None else []) if job_id not in kept_ids]
+        added = [meta["id"] for meta in fresh_meta] if current is not None else None
+        return self._attach_index(self.load(), added, removed)
+
+    def _attach_index(self, engine: RankingEngine, added: Optional[List[str]] = None, removed: List[str] = ()) -> RankingEngine:
+        """Keep the ANN index in step with the snapshot: incremental add/remove, full rebuild when outgrown."""
+        if INDEX_TYPE != "ivf" or not len(engine):
+            return engine
+        if self._index is None or added is None or self._index.needs_retrain():
+            self._index = build_ivf_index(engine.ids, engine.matrix)
+        else:
+            self._index.remove(removed)
+            self._index.add(added, engine.matrix[[engine.row_of(job_id) for job_id in added]])
+        engine.index = self._index
+        return engine
+
+    def _write(self, matrix: np.ndarray, jobs: List[dict], synced_through: Optional[datetime.datetime], built_at: datetime.datetime):
+        os.makedirs(self.directory, exist_ok=True)
+        previous = self._files(self._meta) if self._meta else []
+        generation = uuid.uuid4().hex
+        matrix_file = f"embeddings-{generation}.npy"
+        np.save(os.path.join(self.directory, matrix_file), np.ascontiguousarray(matrix, dtype=np.float32))
+
+        quantized = {}
+        if QUANTIZATION != "none":
+            coarse = QuantizedVectors.from_matrix(QUANTIZATION, matrix)
+            quantized[QUANTIZATION] = {"codes": f"{QUANTIZATION}-{generation}.npy"}
+            np.save(os.path.join(self.directory, quantized[QUANTIZATION]["codes"]), coarse.codes)
+            if coarse.scales is not None:
+                quantized[QUANTIZATION]["scales"] = f"{QUANTIZATION}-scales-{generation}.npy"
+                np.save(os.path.join(self.directory, quantized[QUANTIZATION]["scales"]), coarse.scales)
+
+        meta = {
+            "matrix_file": matrix_file,
+            "dim": int(matrix.shape[1]),
+            "synced_through": _to_iso(synced_through),
+            "built_at": _to_iso(built_at),
+            "quantized": quantized,
+            "jobs": jobs,
+        }
+        tmp_path = f"{self.meta_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+        # Open mmaps keep the old files alive until their readers drop them.
+        for name in previous:
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    @staticmethod
+    def _files(meta: dict) -> List[str]:
+        names = [meta["matrix_file"]]
+        for files in meta.get("quantized", {}).values():
+            names.extend(files.values())
+        return names
+
+
+_snapshots: Dict[str, JobSnapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_snapshot(directory: str) -> JobSnapshot:
+    """Process-wide JobSnapshot for a directory."""
+    with _snapshots_lock:
+        if directory not in _snapshots:
+            _snapshots[directory] = JobSnapshot(directory)
+        return _snapshots[directory]
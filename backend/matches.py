@@ -0,0 +1,140 @@
+import os
+import json
+import base64
+import datetime
+from typing import List, Optional, Tuple
+from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists
+
+from job_cards import job_card_cache, load_job_cards, to_card
+
+# users/{uid}/matches/{job_id} keeps the job's card as it was when saved ("card"), so listing
+# matches is a single ordered query with no job reads.
+MATCHES_PAGE_SIZE = int(os.getenv("MATCHES_PAGE_SIZE", "50"))
+MATCHES_MAX_PAGE_SIZE = 200
+DELETE_CHUNK = 400  # deletes per batch, below Firestore's 500 writes per commit
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _matches(db, uid: str):
+    return db.collection("users").document(uid).collection("matches")
+
+
+def card_snapshot(card: dict) -> dict:
+    return {key: value for key, value in card.items() if key not in ("id", "score")}
+
+
+def match_document(job_id: str, card: dict, score) -> dict:
+    return {
+        "job_id": job_id,
+        "score": score,
+        "matched_at": firestore.SERVER_TIMESTAMP,
+        "status": "saved",
+        "card": card_snapshot(card),
+    }
+
+
+def record_match(db, uid: str, job_id: str, score) -> bool:
+    """Store a match with a snapshot of the job's card; False if the job does not exist."""
+    data = job_card_cache.get(db, job_id)
+    if data is None:
+        return False
+    _matches(db, uid).document(job_id).set(match_document(job_id, to_card(job_id, data), score))
+    return True
+
+
+def mark_applying(db, uid: str, job_id: str, data: dict):
+    """
+    Set a match's status to "applying". A job that was never matched (the live-apply page takes
+    any job id) gets a full match document, so it is listed and paged like the others.
+    """
+    ref = _matches(db, uid).document(job_id)
+    try:
+        ref.create({**match_document(job_id, to_card(job_id, data), 0), "status": "applying"})
+    except AlreadyExists:
+        ref.update({"status": "applying"})
+
+
+def encode_cursor(matched_at: datetime.datetime, job_id: str) -> str:
+    raw = json.dumps({"t": matched_at.isoformat(), "id": job_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return datetime.datetime.fromisoformat(data["t"]), str(data["id"])
+    except Exception:
+        raise InvalidCursor(cursor)
+
+
+def list_matches(db, uid: str, limit: int = MATCHES_PAGE_SIZE, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of matches, newest first, as (cards with score/matched_at/status, next cursor).
+    Matches saved before cards were snapshotted are filled in with one batched read and
+    written back, so the next listing needs no job reads.
+    """
+    limit = max(1, min(limit, MATCHES_MAX_PAGE_SIZE))
+    matches = _matches(db, uid)
+    query = (
+        matches.order_by("matched_at", direction=firestore.Query.DESCENDING)
+        .order_by("__name__", direction=firestore.Query.DESCENDING)
+    )
+    if cursor:
+        matched_at, job_id = decode_cursor(cursor)
+        query = query.start_after({"matched_at": matched_at, "__name__": matches.document(job_id)})
+    docs = list(query.limit(limit + 1).stream())
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1].to_dict()
+        next_cursor = encode_cursor(last["matched_at"], docs[-1].id)
+
+    page = [(doc.id, doc.to_dict()) for doc in docs]
+    legacy = [job_id for job_id, data in page if "card" not in data]
+    if legacy:
+        cards, missing = load_job_cards(db, legacy)
+        by_id = {card["id"]: card for card in cards}
+        batch = db.batch()
+        for job_id, data in page:
+            if job_id in by_id:
+                data["card"] = card_snapshot(by_id[job_id])
+                batch.update(matches.document(job_id), {"card": data["card"]})
+        if by_id:
+            batch.commit()
+        if missing:
+            print(f"Matches for {uid} reference missing jobs: {missing}")
+
+    results = []
+    for job_id, data in page:
+        if "card" not in data:
+            continue
+        results.append({
+            **data["card"],
+            "id": job_id,
+            "score": data.get("score", 0),
+            "matched_at": data.get("matched_at"),
+            "status": data.get("status"),
+        })
+    return results, next_cursor
+
+
+def clear_matches(db, uid: str) -> int:
+    """Delete every match of a user with batched deletes of DELETE_CHUNK; returns the count."""
+    matches = _matches(db, uid)
+    deleted = 0
+    while True:
+        refs = [doc.reference for doc in matches.select([]).limit(DELETE_CHUNK).stream()]
+        if not refs:
+            return deleted
+        batch = db.batch()
+        for ref in refs:
+            batch.delete(ref)
+        batch.commit()
+        deleted += len(refs)
+        if len(refs) < DELETE_CHUNK:
+            return deleted
@@ -2,22 +2,37 @@ import os
 import json
 import tempfile
 import numpy as np
-import pytesseract
-from pdf2image import convert_from_path
 
 import modal
 from google import genai
 from google.genai import types
-from sklearn.metrics.pairwise import cosine_similarity
-from fastapi import Depends, FastAPI, Header, UploadFile, File, HTTPException, WebSocket, WebSocketDisconnect
-from fastapi.responses import StreamingResponse
+from fastapi import Depends, FastAPI, Header, Query, Request, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional, Tuple, Union
 import firebase_admin
 from firebase_admin import credentials, firestore, auth
 from google.api_core.exceptions import ResourceExhausted
 
+from ranking import RANKED_FEED_SIZE, RankingEngine, build_feed, to_job_result
+from job_snapshot import feed_behind, get_snapshot, incremental_feed
+from query_embeddings import EMBEDDING_DIM, EMBEDDING_MODEL, profile_text, query_embedding_for
+from ranking_queue import QUEUED, READY, RUNNING, STATUS_FIELD, RankingQueue, store_status, stored_status
+from job_filters import filtered_rows, filters_from_params
+from ranked_feed import FeedReader, clear_feed, write_feed
+from job_cards import job_card_cache, load_description, load_job_cards
+from card_prefetch import CardPrefetcher, prefetch_metrics
+from feed_cursor import CursorBuffer
+from blocking_io import iterate_blocking, run_blocking
+from matches import MATCHES_PAGE_SIZE, InvalidCursor, clear_matches, list_matches, record_match
+from swipes import MAX_SWIPE_BATCH, apply_swipes
+from seen_jobs import LEGACY_SEEN_FIELD, carry_seen, load_seen, seen_rows
+import resume_text
+from resume_text import EXTRACTOR_VERSION, OCRBusy, UnsupportedDocument
+from parse_cache import ParseCache, prompt_version
+from uploads import RESUME_MAX_BYTES, MalformedUpload, UploadTooLarge, declared_too_large, receive_upload
+
 app = modal.App("tfj-backend")
 
 volume = modal.Volume.from_name("tfj-data", create_if_missing=True)
@@ -37,14 +52,26 @@ image = (
         "pdf2image",
         "python-dotenv",
     )
+    .add_local_python_source("ranking", "ann_index", "job_snapshot", "query_embeddings", "quantization", "ranking_queue", "job_filters", "ranked_feed", "job_cards", "card_prefetch", "feed_cursor", "blocking_io", "matches", "swipes", "seen_jobs", "resume_text", "parse_cache", "uploads")
 )
 
 VOLUME_PATH = "/data"
 FIREBASE_CRED_PATH = f"{VOLUME_PATH}/firebase-credentials.json"
 SYSTEM_PROMPT_PATH = f"{VOLUME_PATH}/system_prompt.txt"
+JOB_SNAPSHOT_DIR = f"{VOLUME_PATH}/job_snapshot"
+PARSE_CACHE_DIR = f"{VOLUME_PATH}/resume_cache"
+RESUME_PARSE_MODEL = "gemini-2.0-flash"
+PRIVATE_USER_FIELDS = (LEGACY_SEEN_FIELD, "query_embedding")
+parse_cache = ParseCache(PARSE_CACHE_DIR)
 
 web_app = FastAPI(title="Resume Parser & Job Recommendation API")
 
+@web_app.middleware("http")
+async def reject_oversized_resumes(request, call_next):
+    if request.url.path == "/parse-resume" and declared_too_large(request.headers.get("content-length")):
+        return JSONResponse(status_code=413, content={"detail": f"Resume exceeds {RESUME_MAX_BYTES // (1024 * 1024)} MB"})
+    return await call_next(request)
+
 web_app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -90,32 +117,55 @@ def get_current_user(authorization: str = Header(...)):
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-def extract_text_from_pdf(pdf_path: str) -> str:
+async def extract_resume_text(path: str) -> Tuple[str, str]:
     try:
-        images = convert_from_path(pdf_path)
-        text_content = ""
-        for image in images:
-            text_content += pytesseract.image_to_string(image)
-        return text_content
+        kind, text_content, _ = await resume_text.extract_text(path)
+        return kind, text_content
+    except UnsupportedDocument as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OCRBusy:
+        raise HTTPException(status_code=503, detail="Resume processing is busy, please retry shortly")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"PDF extraction error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Resume extraction error: {str(e)}")
 
-def parse_resume_with_llm(text_content: str) -> dict:
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not found")
-    
+async def cached_resume_text(path: str, digest: str) -> Tuple[str, str]:
+    cached = await run_blocking(parse_cache.get, "text", digest, EXTRACTOR_VERSION)
+    if cached is not None:
+        return cached["kind"], cached["text"]
+    kind, text_content = await extract_resume_text(path)
+    await run_blocking(parse_cache.put, {"kind": kind, "text": text_content}, "text", digest, EXTRACTOR_VERSION)
+    return kind, text_content
+
+def read_system_prompt() -> str:
     if not os.path.exists(SYSTEM_PROMPT_PATH):
         raise HTTPException(status_code=500, detail="system_prompt.txt not found")
-
     with open(SYSTEM_PROMPT_PATH, "r", encoding="utf-8") as f:
-        system_prompt = f.read()
+        return f.read()
+
+def cached_resume_parse(digest: str, text_content: str) -> dict:
+    system_prompt = read_system_prompt()
+    key = ("parsed", digest, prompt_version(system_prompt), RESUME_PARSE_MODEL)
+    parsed_data = parse_cache.get(*key)
+    if parsed_data is not None:
+        return parsed_data
+    parsed_data = parse_resume_with_llm(text_content, system_prompt)
+    parse_cache.put({
+        "info_dict": parsed_data.get("info_dict", {}),
+        "job_dict": parsed_data.get("job_dict", {}),
+        "new_keys_tracker": parsed_data.get("new_keys_tracker", {}),
+    }, *key)
+    return parsed_data
+
+def parse_resume_with_llm(text_content: str, system_prompt: str) -> dict:
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not found")
 
     client = genai.Client(api_key=api_key)
     try:
         prompt = f"{system_prompt}\n\nResume Text:\n{text_content}"
         response = client.models.generate_content(
-            model="gemini-2.0-flash", 
+            model=RESUME_PARSE_MODEL, 
             contents=prompt,
         )
         response_text = response.text.strip()
@@ -134,55 +184,30 @@ def create_embedding(text: str) -> np.ndarray:
     client = genai.Client(api_key=api_key)
     try:
         response = client.models.embed_content(
-            model="gemini-embedding-2",
+            model=EMBEDDING_MODEL,
             contents=text,
-            config=types.EmbedContentConfig(output_dimensionality=768)
+            config=types.EmbedContentConfig(output_dimensionality=EMBEDDING_DIM)
         )
         return np.array(response.embeddings[0].values).reshape(1, -1)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Embedding error: {str(e)}")
 
-def load_job_database() -> List[dict]:
+def load_job_index() -> RankingEngine:
     try:
-        database = init_firebase()
-        jobs_ref = database.collection("resumes").stream()
-        jobs = []
-        for doc in jobs_ref:
-            data = doc.to_dict()
-            data["id"] = doc.id
-            jobs.append(data)
-        if not jobs:
-            raise HTTPException(status_code=404, detail="No jobs found in Firestore")
-        return jobs
+        engine = get_snapshot(JOB_SNAPSHOT_DIR).engine(init_firebase())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Firestore error: {str(e)}")
+    if not len(engine):
+        raise HTTPException(status_code=404, detail="No jobs found in Firestore")
+    return engine
 
-def rank_jobs_by_similarity(job_dict: dict, database: List[dict], top_k: int = 50) -> List[dict]:
-    job_text = json.dumps(job_dict, sort_keys=True)
-    query_embedding = create_embedding(job_text)
-    results = []
-    for item in database:
-        embedding = item.get("embedding")
-        if not embedding:
-            continue
-        item_embedding = np.array(embedding).reshape(1, -1)
-        score = cosine_similarity(query_embedding, item_embedding)[0][0]
-        job_result = {
-            "id": item["id"],
-            "title": item.get("title", ""),
-            "company": item.get("company_name", ""),
-            "tags": item.get("tags", []),
-            "location": item.get("location", ""),
-            "extensions": item.get("extensions", {}),
-            "apply_link": item.get("share_link", ""),
-            "description_snippet": item.get("description", "")[:300],
-            "score": float(score),
-        }
-        results.append(job_result)
-    results.sort(key=lambda x: x["score"], reverse=True)
-    return results[:top_k]
+def rank_jobs_by_similarity(job_dict: dict, database: Union[List[dict], RankingEngine], top_k: int = 50, query_embedding: Optional[np.ndarray] = None, filters: Optional[dict] = None) -> List[dict]:
+    if query_embedding is None:
+        query_embedding = create_embedding(profile_text(job_dict))
+    engine = database if isinstance(database, RankingEngine) else RankingEngine.from_jobs(database)
+    return [to_job_result(engine.metadata[row], score) for row, score in engine.search(query_embedding, top_k, rows=filtered_rows(engine, filters))]
 
-def compute_and_store_ranking(uid):
+def compute_and_store_ranking(uid, incremental: bool = False):
     try:
         database = init_firebase()
         user_doc = database.collection("users").document(uid).get()
@@ -192,123 +217,162 @@ def compute_and_store_ranking(uid):
         job_dict = user_data.get("job_dict")
         if not job_dict:
             return
-        job_database = load_job_database()
-        ranked_jobs = rank_jobs_by_similarity(job_dict, job_database, top_k=3000)
-        seen_titles = set()
-        unique_ranked_jobs = []
-        for job in ranked_jobs:
-            title = job.get("title", "").strip().lower()
-            if title and title not in seen_titles:
-                seen_titles.add(title)
-                unique_ranked_jobs.append(job)
-        ranked_jobs_data = [{"id": job["id"], "score": job["score"]} for job in unique_ranked_jobs]
-        database.collection("users").document(uid).update({
-            "ranked_jobs": ranked_jobs_data,
-            "ranking_updated_at": firestore.SERVER_TIMESTAMP
+        job_database = load_job_index()
+        query_embedding, embedding_updates = query_embedding_for(job_dict, user_data, create_embedding)
+        allowed = filtered_rows(job_database, user_data.get("job_filters"))
+        seen = seen_rows(job_database, load_seen(database, uid, user_data))  # swiped jobs from earlier feeds never come back
+        previous = FeedReader(database, uid, user_data)
+        count = cursor_buffer.current(uid, user_data.get("count", 0), user_data.get("updated_at"))  # includes unflushed swipes
+        if incremental and not embedding_updates and user_data.get("ranked_through"):
+            ranked_jobs_data = incremental_feed(job_database, query_embedding, previous.slice(0), count, allowed, seen, user_data["ranked_through"])
+            write_feed(database, uid, ranked_jobs_data, previous.pointer, {"ranking_updated_at": firestore.SERVER_TIMESTAMP, "ranked_through": job_database.synced_through})
+            return
+        hits = job_database.search(query_embedding, RANKED_FEED_SIZE, rows=allowed, exclude=seen)
+        ranked_jobs_data = build_feed(job_database, hits, previous.slice(0, count), count)
+        write_feed(database, uid, ranked_jobs_data, previous.pointer, {
+            "ranking_updated_at": firestore.SERVER_TIMESTAMP,
+            "ranked_through": job_database.synced_through,
+            **embedding_updates,
         })
     except Exception as e:
         print(f"Error in compute_and_store_ranking: {str(e)}")
+        raise
+
+ranking_queue = RankingQueue(compute_and_store_ranking, record=lambda uid, status, error: store_status(init_firebase(), uid, status, error))
+cursor_buffer = CursorBuffer(init_firebase)
+RANKING_WAIT_SECONDS = float(os.environ.get("RANKING_WAIT_SECONDS", "20"))
 
 @web_app.get("/save-profile")
-async def save_profile(user: dict = Depends(get_current_user)):
+async def save_profile(user: dict = Depends(get_current_user), remote: Optional[bool] = None, schedule_type: Optional[List[str]] = Query(None), location: Optional[List[str]] = Query(None), clear_filters: bool = False):
     try:
+        filters = {} if clear_filters else filters_from_params(remote, schedule_type, location)
+        if filters is not None:
+            user_ref = init_firebase().collection("users").document(user["uid"])
+            user_doc = await run_blocking(user_ref.get)
+            if user_doc.exists and (user_doc.to_dict().get("job_filters") or {}) != filters:
+                await run_blocking(user_ref.update, {"job_filters": filters})
+                ranking_queue.submit(user["uid"])
+        ranking_status = None
+        if ranking_queue.is_pending(user["uid"]):
+            ranking_status = await ranking_queue.wait(user["uid"], RANKING_WAIT_SECONDS)
+            if ranking_status in (QUEUED, RUNNING):
+                return {"success": True, "ranked_jobs": [], "total_jobs": 0, "ranking_status": ranking_status}
         database = init_firebase()
-        user_doc = database.collection("users").document(user["uid"]).get()
+        user_doc = await run_blocking(database.collection("users").document(user["uid"]).get)
         if not user_doc.exists:
             raise HTTPException(status_code=404, detail="User data not found")
         user_data = user_doc.to_dict()
-        count = user_data.get("count", 0)
-        ranked_jobs_data = user_data.get("ranked_jobs", [])
-        current_batch = ranked_jobs_data[count : count + 5]
-        jobs_to_send_details = []
-        for item in current_batch:
-            job_id = item["id"]
-            score = item["score"]
-            job_doc = database.collection("resumes").document(job_id).get()
-            if job_doc.exists:
-                job_data = job_doc.to_dict()
-                job_data = {key: job_data.get(key, "") for key in ["apply_options", "company_name", "description", "detected_extensions", "extensions", "job_highlights", "location", "title"]}
-                job_data["id"] = job_id
-                job_data["score"] = score
-                jobs_to_send_details.append(job_data)
-        if jobs_to_send_details:
-            database.collection("users").document(user["uid"]).update({
-                "count": count + len(jobs_to_send_details)
-            })
+        epoch = user_data.get("updated_at")
+        count = cursor_buffer.current(user["uid"], user_data.get("count", 0), epoch)
+        ranked_jobs_data = FeedReader(database, user["uid"], user_data)
+        stored = stored_status(user_data)
+        if ranking_status is None and not len(ranked_jobs_data) and stored and stored["status"] in (QUEUED, RUNNING):
+            return {"success": True, "ranked_jobs": [], "total_jobs": 0, "ranking_status": stored["status"]}
+        if ranking_status is None and feed_behind(user_data, get_snapshot(JOB_SNAPSHOT_DIR).current()):
+            ranking_queue.submit(user["uid"], incremental=True)
+        current_batch = await run_blocking(ranked_jobs_data.slice, count, count + 5)
+        scores = {item["id"]: item["score"] for item in current_batch}
+        jobs_to_send_details, _ = await run_blocking(load_job_cards, database, [item["id"] for item in current_batch])
+        for job_data in jobs_to_send_details:
+            job_data["score"] = scores[job_data["id"]]
+        if current_batch:
+            cursor_buffer.advance(user["uid"], count + len(current_batch), epoch, [item["id"] for item in current_batch])
+            await run_blocking(cursor_buffer.flush, user["uid"])
         return {
             "success": True,
             "ranked_jobs": jobs_to_send_details,
-            "total_jobs": len(ranked_jobs_data)
+            "total_jobs": len(ranked_jobs_data),
+            "ranking_status": ranking_status or READY
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@web_app.get("/ranking-status")
+async def get_ranking_status(user: dict = Depends(get_current_user)):
+    user_doc = await run_blocking(init_firebase().collection("users").document(user["uid"]).get, field_paths=[STATUS_FIELD, "ranking_updated_at"])
+    user_data = user_doc.to_dict() if user_doc.exists else {}
+    status = ranking_queue.status(user["uid"], user_data)
+    if status is None:
+        ranked = user_data.get("ranking_updated_at") is not None
+        status = {"status": READY if ranked else None, "updated_at": None, "error": None}
+    return {"success": True, **status}
+
 @web_app.websocket("/ws/jobs")
 async def jobs_ws(ws: WebSocket):
     await ws.accept()
+    upcoming = None
+    uid = None
     try:
         token = ws.query_params.get("token")
         if not token:
             await ws.close(code=1008)
             return
-        decoded = auth.verify_id_token(token)
+        decoded = await run_blocking(auth.verify_id_token, token)
         uid = decoded["uid"]
         database = init_firebase()
         user_ref = database.collection("users").document(uid)
-        user = user_ref.get().to_dict()
-        ranked_jobs_data = user.get("ranked_jobs", [])
-        count = user.get("count", 0)
+        user = (await run_blocking(user_ref.get)).to_dict()
+        ranked_jobs_data = FeedReader(database, uid, user)
+        epoch = user.get("updated_at")
+        count = cursor_buffer.current(uid, user.get("count", 0), epoch)
+        upcoming = CardPrefetcher(database, ranked_jobs_data, count, lambda: FeedReader(database, uid, user_ref.get().to_dict()))
+        upcoming.start()
         while True:
             data = json.loads(await ws.receive_text())
             if data["type"] == "NEXT_JOB":
-                if count >= len(ranked_jobs_data):
+                next_card = await upcoming.next()
+                if next_card is None:
                     await ws.send_json({"type": "END"})
                     continue
-                item = ranked_jobs_data[count]
-                job_id = item["id"]
-                score = item["score"]
-                count += 1
-                doc = database.collection("resumes").document(job_id).get()
-                if doc.exists:
-                    job_data = doc.to_dict()
-                    job_data = {key: job_data.get(key, "") for key in ["apply_options", "company_name", "description", "detected_extensions", "extensions", "job_highlights", "location", "title"]}
-                    job_data["id"] = job_id
-                    job_data["score"] = score
-                    await ws.send_json({"type": "JOB", "job": job_data})
-                user_ref.update({"count": count})
+                position, job_data = next_card
+                count = position + 1
+                await ws.send_json({"type": "JOB", "job": job_data, "position": position})
+                cursor_buffer.advance(uid, count, epoch, [job_data["id"]])
     except WebSocketDisconnect:
         pass
+    finally:
+        if upcoming is not None:
+            upcoming.close()
+        if uid is not None:
+            await run_blocking(cursor_buffer.flush, uid)
 
 @web_app.post("/parse-resume")
-async def parse_resume(file: UploadFile = File(...), user: dict = Depends(get_current_user)):
-    if not file.filename.lower().endswith(('.pdf', '.docx')):
-        raise HTTPException(status_code=400, detail="Only PDF and DOCX files are supported")
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-        content = await file.read()
-        tmp_file.write(content)
-        tmp_path = tmp_file.name
+async def parse_resume(request: Request, user: dict = Depends(get_current_user)):
+    try:
+        tmp_path, digest = await receive_upload(request, tempfile.gettempdir())
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (UnsupportedDocument, MalformedUpload) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     try:
-        raw_text = extract_text_from_pdf(tmp_path)
+        kind, raw_text = await cached_resume_text(tmp_path, digest)
         if not raw_text.strip():
-            raise HTTPException(status_code=400, detail="Could not extract text from PDF")
-        parsed_data = parse_resume_with_llm(raw_text)
+            raise HTTPException(status_code=400, detail=f"Could not extract text from {kind.upper()}")
+        parsed_data = await run_blocking(cached_resume_parse, digest, raw_text)
         info_dict = parsed_data.get("info_dict", {})
         job_dict = parsed_data.get("job_dict", {})
         new_keys_tracker = parsed_data.get("new_keys_tracker", {})
         database = init_firebase()
-        database.collection("users").document(user["uid"]).set(
+        # Jobs shown from the old feed stay excluded from the new one
+        await run_blocking(cursor_buffer.flush, user["uid"])
+        await run_blocking(carry_seen, database, user["uid"])
+        kept = await run_blocking(database.collection("users").document(user["uid"]).get, field_paths=["job_filters"])
+        job_filters = kept.to_dict().get("job_filters") if kept.exists else None
+        await run_blocking(clear_feed, database, user["uid"])
+        await run_blocking(
+            database.collection("users").document(user["uid"]).set,
             {
                 "info_dict": info_dict,
                 "job_dict": job_dict,
                 "dynamic_keys": new_keys_tracker,
                 "count": 0,
-                "ranked_jobs": [],
                 "updated_at": firestore.SERVER_TIMESTAMP,
+                **({"job_filters": job_filters} if job_filters else {}),
             },
             merge=False,
         )
+        ranking_queue.submit(user["uid"])
         return {
             "success": True,
             "info_dict": info_dict,
@@ -318,21 +382,22 @@ async def parse_resume(file: UploadFile = File(...), user: dict = Depends(get_cu
                 "job_dict": new_keys_tracker.get("job_dict", [])
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         if os.path.exists(tmp_path):
             os.unlink(tmp_path)
-        compute_and_store_ranking(user["uid"])
 
 @web_app.get("/me")
 async def get_my_profile(user: dict = Depends(get_current_user)):
     try:
         database = init_firebase()
-        doc = database.collection("users").document(user["uid"]).get()
+        doc = await run_blocking(database.collection("users").document(user["uid"]).get)
         if not doc.exists:
             raise HTTPException(status_code=404, detail="User data not found")
-        return {"success": True, "data": doc.to_dict()}
+        return {"success": True, "data": {key: value for key, value in doc.to_dict().items() if key not in PRIVATE_USER_FIELDS}}
     except ResourceExhausted:
         raise HTTPException(status_code=429, detail="Service usage limit exceeded")
     except Exception as e:
@@ -345,36 +410,47 @@ async def save_match(match_data: dict, user: dict = Depends(get_current_user)):
         score = match_data.get("score", 0)
         if not job_id:
             raise HTTPException(status_code=400, detail="job_id is required")
-        database = init_firebase()
-        database.collection("users").document(user["uid"]).collection("matches").document(job_id).set({
-            "job_id": job_id,
-            "score": score,
-            "matched_at": firestore.SERVER_TIMESTAMP,
-            "status": "saved"
-        })
+        if not await run_blocking(record_match, init_firebase(), user["uid"], job_id, score):
+            raise HTTPException(status_code=404, detail="Job not found")
         return {"success": True}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to save match")
 
-@web_app.get("/matches")
-async def get_matches(user: dict = Depends(get_current_user)):
+class SwipeEvent(BaseModel):
+    job_id: str
+    action: str
+    position: Optional[int] = None
+
+class SwipeBatch(BaseModel):
+    events: List[SwipeEvent]
+
+@web_app.post("/swipes")
+async def save_swipes(batch: SwipeBatch, user: dict = Depends(get_current_user)):
+    if len(batch.events) > MAX_SWIPE_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_SWIPE_BATCH} events per batch")
     try:
         database = init_firebase()
-        matches_ref = database.collection("users").document(user["uid"]).collection("matches").stream()
-        matches = []
-        for doc in matches_ref:
-            match_data = doc.to_dict()
-            job_id = match_data.get("job_id")
-            saved_score = match_data.get("score", 0)
-            job_doc = database.collection("resumes").document(job_id).get()
-            if job_doc.exists:
-                job_data = job_doc.to_dict()
-                job_data = {key: job_data.get(key, "") for key in ["apply_options", "company_name", "description", "detected_extensions", "extensions", "job_highlights", "location", "title"]}
-                job_data["id"] = job_id
-                job_data["score"] = saved_score
-                job_data["matched_at"] = match_data.get("matched_at")
-                matches.append(job_data)
-        return {"success": True, "matches": matches}
+        user_doc = await run_blocking(database.collection("users").document(user["uid"]).get)
+        if not user_doc.exists:
+            raise HTTPException(status_code=404, detail="User data not found")
+        user_data = user_doc.to_dict()
+        cursor = cursor_buffer.current(user["uid"], user_data.get("count", 0), user_data.get("updated_at"))
+        results, count = await run_blocking(apply_swipes, database, user["uid"], user_data, [event.model_dump() for event in batch.events], cursor)
+        return {"success": True, "results": results, "count": count}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Failed to save swipes")
+
+@web_app.get("/matches")
+async def get_matches(user: dict = Depends(get_current_user), limit: int = MATCHES_PAGE_SIZE, cursor: Optional[str] = None):
+    try:
+        matches, next_cursor = await run_blocking(list_matches, init_firebase(), user["uid"], limit, cursor)
+        return {"success": True, "matches": matches, "next_cursor": next_cursor}
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to fetch matches")
 
@@ -382,7 +458,7 @@ async def get_matches(user: dict = Depends(get_current_user)):
 async def delete_match(job_id: str, user: dict = Depends(get_current_user)):
     try:
         database = init_firebase()
-        database.collection("users").document(user["uid"]).collection("matches").document(job_id).delete()
+        await run_blocking(database.collection("users").document(user["uid"]).collection("matches").document(job_id).delete)
         return {"success": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to delete match")
@@ -390,14 +466,23 @@ async def delete_match(job_id: str, user: dict = Depends(get_current_user)):
 @web_app.delete("/matches")
 async def clear_all_matches(user: dict = Depends(get_current_user)):
     try:
-        database = init_firebase()
-        matches_ref = database.collection("users").document(user["uid"]).collection("matches").stream()
-        for doc in matches_ref:
-            doc.reference.delete()
-        return {"success": True}
+        deleted = await run_blocking(clear_matches, init_firebase(), user["uid"])
+        return {"success": True, "deleted": deleted}
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to clear matches")
 
+@web_app.get("/job/{job_id}/description")
+async def get_job_description(job_id: str, user: dict = Depends(get_current_user)):
+    try:
+        description = await run_blocking(load_description, init_firebase(), job_id)
+        if description is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return {"success": True, "job_id": job_id, "description": description}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Failed to fetch job description")
+
 class ChatRequest(BaseModel):
     message: str
     job_id: str
@@ -423,16 +508,16 @@ Always reference specific details from both the resume and job posting."""
 async def chat_with_job(request: ChatRequest, user: dict = Depends(get_current_user)):
     try:
         database = init_firebase()
-        user_doc = database.collection("users").document(user["uid"]).get()
+        user_doc = await run_blocking(database.collection("users").document(user["uid"]).get)
         if not user_doc.exists:
             raise HTTPException(status_code=404, detail="User data not found")
         user_data = user_doc.to_dict()
         info_dict = user_data.get("info_dict", {})
         job_dict = user_data.get("job_dict", {})
-        job_doc = database.collection("resumes").document(request.job_id).get()
-        if not job_doc.exists:
+        job_data = await run_blocking(job_card_cache.get, database, request.job_id)
+        if job_data is None:
             raise HTTPException(status_code=404, detail="Job not found")
-        job_data = job_doc.to_dict()
+        description = await run_blocking(load_description, database, request.job_id, job_data)
         resume_context = f"""
 USER'S RESUME:
 Name: {info_dict.get('name', 'Unknown')}
@@ -447,7 +532,7 @@ CURRENT JOB:
 Title: {job_data.get('title', 'Unknown')}
 Company: {job_data.get('company_name', 'Unknown')}
 Location: {job_data.get('location', 'N/A')}
-Description: {job_data.get('description', 'No description')[:3000]}
+Description: {(description or 'No description')[:3000]}
 Requirements: {json.dumps(job_data.get('job_highlights', []), indent=2)}
 Tags: {json.dumps(job_data.get('extensions', []), indent=2)}
 """
@@ -465,11 +550,12 @@ Provide a helpful, concise response:"""
             api_key = os.environ.get("GEMINI_API_KEY")
             client = genai.Client(api_key=api_key)
             try:
-                response = client.models.generate_content_stream(
+                response = await run_blocking(
+                    client.models.generate_content_stream,
                     model="gemini-2.0-flash",
                     contents=full_prompt,
                 )
-                for chunk in response:
+                async for chunk in iterate_blocking(response):
                     if chunk.text:
                         yield f"data: {json.dumps({'text': chunk.text})}\n\n"
                 yield "data: [DONE]\n\n"
@@ -488,7 +574,11 @@ Provide a helpful, concise response:"""
 
 @web_app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {"status": "healthy", "job_card_cache": job_card_cache.stats(), "ws_prefetch": prefetch_metrics.stats(), "cursor_buffer": cursor_buffer.stats()}
+
+@web_app.on_event("shutdown")
+def flush_cursors():
+    cursor_buffer.flush_all()
 
 @app.function(
     image=image,
@@ -0,0 +1,102 @@
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# 64 hash functions split into 16 LSH bands of 4 rows: pairs with Jaccard >= ~0.5 collide in
+# at least one band with high probability. Candidates are then confirmed on the estimated
+# Jaccard of the descriptions and on embedding cosine similarity.
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+JACCARD_THRESHOLD = 0.6
+COSINE_THRESHOLD = 0.92
+
+_PRIME = 4294967311  # smallest prime above 2**32
+_rng = np.random.default_rng(20240601)  # fixed: signatures are stored and compared across runs
+_A = _rng.integers(1, 2**31, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 2**31, size=NUM_PERM, dtype=np.uint64)
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def shingles(text: str) -> set:
+    tokens = _TOKEN.findall((text or "").lower())
+    if len(tokens) < SHINGLE_SIZE:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text: str) -> Optional[List[int]]:
+    """MinHash signature of a description's word shingles, or None for empty text."""
+    grams = shingles(text)
+    if not grams:
+        return None
+    hashed = np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams))
+    permuted = (hashed[:, None] * _A + _B) % _PRIME
+    return permuted.min(axis=0).astype(np.int64).tolist()
+
+
+def estimated_jaccard(a: Sequence[int], b: Sequence[int]) -> float:
+    return float(np.mean(np.asarray(a) == np.asarray(b)))
+
+
+def _bands(signature: Sequence[int]):
+    for band in range(BANDS):
+        yield band, tuple(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+
+
+def _unit(embedding) -> Optional[np.ndarray]:
+    if embedding is None or not len(embedding):
+        return None
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+
+class NearDuplicateIndex:
+    """
+    LSH index over the canonical job of every cluster. find() returns the canonical job id a
+    new posting duplicates (same description up to aggregator noise and a near-identical
+    embedding), or None if it starts a new cluster.
+    """
+
+    def __init__(self, jaccard_threshold: float = JACCARD_THRESHOLD, cosine_threshold: float = COSINE_THRESHOLD):
+        self.jaccard_threshold = jaccard_threshold
+        self.cosine_threshold = cosine_threshold
+        self._buckets: Dict[tuple, List[str]] = defaultdict(list)
+        self._signatures: Dict[str, List[int]] = {}
+        self._embeddings: Dict[str, Optional[np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def add(self, job_id: str, signature: Optional[Sequence[int]], embedding=None):
+        if signature is None:
+            return
+        self._signatures[job_id] = list(signature)
+        self._embeddings[job_id] = _unit(embedding)
+        for band, key in _bands(signature):
+            self._buckets[(band, key)].append(job_id)
+
+    def find(self, signature: Optional[Sequence[int]], embedding=None) -> Optional[str]:
+        if signature is None:
+            return None
+        vector = _unit(embedding)
+        candidates = set()
+        for band, key in _bands(signature):
+            candidates.update(self._buckets.get((band, key), ()))
+
+        best, best_score = None, -1.0
+        for job_id in candidates:
+            jaccard = estimated_jaccard(signature, self._signatures[job_id])
+            if jaccard < self.jaccard_threshold:
+                continue
+            other = self._embeddings.get(job_id)
+            if vector is not None and other is not None and float(vector @ other) < self.cosine_threshold:
+                continue
+            if jaccard > best_score:
+                best, best_score = job_id, jaccard
+        return best
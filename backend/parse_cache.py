@@ -0,0 +1,95 @@
+import os
+import json
+import uuid
+import hashlib
+import threading
+from typing import Optional
+
+# Content-addressed cache for resume uploads: the extracted text is keyed by the SHA-256 of
+# the uploaded bytes (and the extractor version), the parsed JSON additionally by the system
+# prompt and the model. Entries are JSON files; once the directory grows past
+# PARSE_CACHE_MAX_BYTES the least recently used ones are deleted down to 90% of it.
+PARSE_CACHE_MAX_BYTES = int(os.getenv("PARSE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+_SUFFIX = ".json"
+
+
+def prompt_version(system_prompt: str) -> str:
+    """Version of a system prompt: a short hash of its text, so any edit invalidates parses."""
+    return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def cache_key(*parts) -> str:
+    return hashlib.sha256("\0".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+class ParseCache:
+    """Size-bounded LRU of JSON values on local disk; safe to share between threads and processes."""
+
+    def __init__(self, directory: str, max_bytes: int = PARSE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None  # bytes on disk, counted on first write
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, *parts) -> Optional[dict]:
+        path = self._path(cache_key(*parts))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)  # recency for eviction
+            return value
+        except (OSError, ValueError):
+            return None
+
+    def put(self, value: dict, *parts):
+        path = self._path(cache_key(*parts))
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Parse cache write failed: {e}")
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        """(path, size, last used) of every entry."""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(_SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        size = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for path, entry_size, _ in entries:
+            if size <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            size -= entry_size
+            removed += 1
+        self._size = size
+        print(f"Parse cache evicted {removed} entr{'y' if removed == 1 else 'ies'}, {size} bytes left")
@@ -0,0 +1,82 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+EMBEDDING_MODEL = "gemini-embedding-2"
+EMBEDDING_DIM = 768
+CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+
+
+def profile_text(job_dict: dict) -> str:
+    """Canonical text that gets embedded for a user's job_dict."""
+    return json.dumps(job_dict, sort_keys=True)
+
+
+def profile_hash(job_dict: dict) -> str:
+    """Identifies a query vector: canonical profile text plus the model and dimension that embedded it."""
+    key = f"{EMBEDDING_MODEL}:{EMBEDDING_DIM}:{profile_text(job_dict)}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Small thread-safe LRU mapping."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_cache = LRUCache(CACHE_SIZE)
+
+
+def query_embedding_for(job_dict: dict, user_data: Optional[dict], embed: Callable[[str], np.ndarray]) -> Tuple[np.ndarray, dict]:
+    """
+    Return (query vector, user fields to persist). The vector comes from the in-process LRU,
+    then from the user document if its stored hash still matches, and only then from embed().
+    The returned fields are empty when the user document is already up to date.
+    """
+    key = profile_hash(job_dict)
+    user_data = user_data or {}
+
+    stored = user_data.get("query_embedding")
+    if stored and user_data.get("query_embedding_hash") == key:
+        vector = _cache.get(key)
+        if vector is None:
+            vector = np.asarray(stored, dtype=np.float32)
+            _cache.put(key, vector)
+        return vector, {}
+
+    vector = _cache.get(key)
+    if vector is None:
+        vector = np.asarray(embed(profile_text(job_dict)), dtype=np.float32).ravel()
+        _cache.put(key, vector)
+
+    return vector, {
+        "query_embedding": vector.tolist(),
+        "query_embedding_hash": key,
+        "query_embedding_model": EMBEDDING_MODEL,
+        "query_embedding_dim": EMBEDDING_DIM,
+    }
@@ -0,0 +1,138 @@
+import os
+import uuid
+import numpy as np
+from typing import List, Optional, Sequence
+from firebase_admin import firestore
+
+# A user's ranked feed lives in users/{uid}/ranked_feed as fixed-size pages, each packing the
+# job ids as one newline-joined string and the scores as little-endian float32 bytes. The user
+# document only holds a small pointer: {"generation", "length", "page_size"}.
+FEED_COLLECTION = "ranked_feed"
+PAGE_SIZE = int(os.getenv("RANKED_FEED_PAGE_SIZE", "250"))
+_SCORE = np.dtype("<f4")
+
+
+def pack_page(items: Sequence[dict]) -> dict:
+    return {
+        "ids": "\n".join(item["id"] for item in items),
+        "scores": np.asarray([item["score"] for item in items], dtype=_SCORE).tobytes(),
+    }
+
+
+def unpack_page(data: dict) -> List[dict]:
+    ids = data["ids"].split("\n") if data.get("ids") else []
+    scores = np.frombuffer(data.get("scores") or b"", dtype=_SCORE)
+    return [{"id": job_id, "score": float(score)} for job_id, score in zip(ids, scores)]
+
+
+def feed_length(user_data: dict) -> int:
+    pointer = user_data.get("ranked_feed")
+    if pointer:
+        return pointer["length"]
+    return len(user_data.get("ranked_jobs", []))
+
+
+def _pages(db, uid: str):
+    return db.collection("users").document(uid).collection(FEED_COLLECTION)
+
+
+def _page_id(generation: str, page: int) -> str:
+    return f"{generation}-{page:05d}"
+
+
+def write_feed(db, uid: str, feed: Sequence[dict], previous: Optional[dict] = None, updates: Optional[dict] = None, batch=None, option=None) -> int:
+    """
+    Stage a new feed generation, the user's pointer to it (plus any extra user updates) and
+    the deletion of the previous generation in one batch, so readers see either the old
+    feed or the new one. Commits unless a batch is passed in; returns the writes staged.
+    option (e.g. db.write_option(last_update_time=...)) guards the pointer update: if the
+    user document changed since it was read, the whole batch fails and nothing is written.
+    """
+    commit = batch is None
+    batch = batch if batch is not None else db.batch()
+    generation = uuid.uuid4().hex[:12]
+    pages = _pages(db, uid)
+    writes = 0
+    for page, start in enumerate(range(0, len(feed), PAGE_SIZE)):
+        batch.set(pages.document(_page_id(generation, page)), pack_page(feed[start:start + PAGE_SIZE]))
+        writes += 1
+
+    pointer = {"generation": generation, "length": len(feed), "page_size": PAGE_SIZE}
+    batch.update(db.collection("users").document(uid), {
+        "ranked_feed": pointer,
+        "ranked_jobs": firestore.DELETE_FIELD,  # legacy in-document feed
+        **(updates or {}),
+    }, option=option)
+    writes += 1
+
+    if previous:
+        for page in range((previous["length"] + previous["page_size"] - 1) // previous["page_size"]):
+            batch.delete(pages.document(_page_id(previous["generation"], page)))
+            writes += 1
+    if commit:
+        batch.commit()
+    return writes
+
+
+def clear_feed(db, uid: str):
+    """Delete every stored feed page for a user (e.g. before their profile is replaced)."""
+    batch = db.batch()
+    pending = 0
+    for ref in _pages(db, uid).list_documents():
+        batch.delete(ref)
+        pending += 1
+        if pending == 100:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    if pending:
+        batch.commit()
+
+
+class FeedReader:
+    """
+    Cursor-style access to a user's stored feed that reads only the pages it needs and keeps
+    the last page in memory, so walking the feed one card at a time costs one read per page.
+    Users ranked before the paged store existed fall back to their in-document ranked_jobs.
+    """
+
+    def __init__(self, db, uid: str, user_data: dict):
+        self.db = db
+        self.uid = uid
+        self.pointer = user_data.get("ranked_feed")
+        self._legacy = None if self.pointer else list(user_data.get("ranked_jobs", []))
+        self._page_no: Optional[int] = None
+        self._page: List[dict] = []
+
+    def __len__(self) -> int:
+        return self.pointer["length"] if self.pointer else len(self._legacy)
+
+    def _load_page(self, page: int) -> List[dict]:
+        if page != self._page_no:
+            doc = _pages(self.db, self.uid).document(_page_id(self.pointer["generation"], page)).get()
+            self._page = unpack_page(doc.to_dict()) if doc.exists else []
+            self._page_no = page
+        return self._page
+
+    def get(self, index: int) -> Optional[dict]:
+        if index < 0 or index >= len(self):
+            return None
+        if self._legacy is not None:
+            return self._legacy[index]
+        page_size = self.pointer["page_size"]
+        items = self._load_page(index // page_size)
+        offset = index % page_size
+        return items[offset] if offset < len(items) else None
+
+    def slice(self, start: int, stop: Optional[int] = None) -> List[dict]:
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return []
+        if self._legacy is not None:
+            return self._legacy[start:stop]
+        page_size = self.pointer["page_size"]
+        items = []
+        for page in range(start // page_size, (stop - 1) // page_size + 1):
+            first = page * page_size
+            items.extend(self._load_page(page)[max(start - first, 0):stop - first])
+        return items
@@ -0,0 +1,219 @@
+import heapq
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Length of the ranked feed stored per user.
+RANKED_FEED_SIZE = 3000
+BATCH_SCORE_BYTES = 256 * 1024 * 1024
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row in place (zero rows are left as zeros)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Return the indices of the k highest scores, best first."""
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k >= n:
+        return np.argsort(-scores, kind="stable")
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class RankingEngine:
+    """
+    Exact cosine ranking over a contiguous, pre-normalized float32 job matrix.
+    Scoring a query is a single matrix-vector product plus a partial top-k.
+    If an approximate index (anything with search(query, top_k) -> [(job_id, score)])
+    is attached, search() delegates candidate selection to it. If a quantized copy of the
+    matrix is attached instead, search() scores that copy and rescores the best
+    rescore_factor * top_k candidates exactly against the float32 rows.
+    A filtered search (rows=...) scores only the candidate rows, so it gets cheaper as the
+    filter gets narrower.
+    """
+
+    def __init__(self, ids: Sequence[str], embeddings: np.ndarray, metadata: Optional[List[dict]] = None, normalized: bool = False, index=None, coarse=None, rescore_factor: int = 4):
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != len(ids):
+            raise ValueError("embeddings must be a 2-D array with one row per id")
+        if not normalized:
+            matrix = normalize_rows(matrix.copy())
+        self.ids = list(ids)
+        self.matrix = matrix
+        self.metadata = metadata if metadata is not None else [{} for _ in self.ids]
+        self.index = index
+        self.coarse = coarse
+        self.rescore_factor = rescore_factor
+        self.bitmaps = None  # job_filters.AttributeBitmaps, built on first filtered search
+        self.seen_index = None  # seen_jobs.SeenIndex, built on first search that excludes seen jobs
+        self.synced_through = None  # latest added_at the job snapshot had synced when these rows were loaded
+        self._rows: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_jobs(cls, jobs: List[dict]) -> "RankingEngine":
+        """Build an engine from Firestore job dicts, skipping jobs without a usable embedding."""
+        kept = []
+        dim = None
+        for item in jobs:
+            embedding = item.get("embedding")
+            if not embedding:
+                continue
+            if dim is None:
+                dim = len(embedding)
+            if len(embedding) != dim:
+                print(f"Skipping job {item.get('id')}: embedding has {len(embedding)} dims, expected {dim}")
+                continue
+            kept.append(item)
+
+        matrix = np.empty((len(kept), dim or 0), dtype=np.float32)
+        for row, item in enumerate(kept):
+            matrix[row] = item["embedding"]
+        metadata = [{key: value for key, value in item.items() if key != "embedding"} for item in kept]
+        return cls([item["id"] for item in kept], normalize_rows(matrix), metadata, normalized=True)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def row_of(self, job_id: str) -> Optional[int]:
+        if self._rows is None:
+            self._rows = {job_id: row for row, job_id in enumerate(self.ids)}
+        return self._rows.get(job_id)
+
+    def prepare_query(self, query_embedding) -> np.ndarray:
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    def scores(self, query_embedding) -> np.ndarray:
+        """Cosine similarity of the query against every job."""
+        return self.matrix @ self.prepare_query(query_embedding)
+
+    def search(self, query_embedding, top_k: int, rows: Optional[Sequence[int]] = None, exclude: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Return [(row, score), ...] for the top_k jobs, best first, optionally restricted to rows.
+        Rows in exclude (sorted) are never returned; the exact path masks them before top-k,
+        approximate paths over-fetch by len(exclude) and drop them. Unless rows restricts it,
+        the result always holds min(top_k, eligible jobs) hits; an index that comes up short
+        falls back to the exact scan.
+        """
+        if not len(self):
+            return []
+        if exclude is not None and len(exclude):
+            if rows is not None:
+                return self.search_rows(query_embedding, np.setdiff1d(rows, exclude, assume_unique=True), top_k)
+            if (self.index is not None and len(self.index)) or (self.coarse is not None and top_k * self.rescore_factor < len(self)):
+                skip = set(exclude.tolist())
+                hits = self.search(query_embedding, top_k + len(skip))
+                return [hit for hit in hits if hit[0] not in skip][:top_k]
+            scores = self.scores(query_embedding)
+            scores[exclude] = -np.inf
+            return [(int(row), float(scores[row])) for row in top_k_indices(scores, min(top_k, len(self) - len(exclude)))]
+        if rows is not None:
+            return self.search_rows(query_embedding, rows, top_k)
+        if self.index is not None and len(self.index):
+            hits = self.index.search(self.prepare_query(query_embedding), top_k)
+            hits = [(self.row_of(job_id), score) for job_id, score in hits if self.row_of(job_id) is not None]
+            if len(hits) == min(top_k, len(self)):
+                return hits
+            # An index out of step with the matrix must not shorten the feed
+            print(f"ANN index returned {len(hits)} of {min(top_k, len(self))} hits, using the exact scan")
+        if self.coarse is not None and top_k * self.rescore_factor < len(self):
+            query = self.prepare_query(query_embedding)
+            candidates = np.sort(top_k_indices(self.coarse.scores(query), top_k * self.rescore_factor))
+            exact = self.matrix[candidates] @ query
+            return [(int(candidates[i]), float(exact[i])) for i in top_k_indices(exact, top_k)]
+        scores = self.scores(query_embedding)
+        return [(int(row), float(scores[row])) for row in top_k_indices(scores, top_k)]
+
+    def search_rows(self, query_embedding, rows: Sequence[int], top_k: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Score only the given rows; returns [(row, score), ...] best first (the top_k, if given)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return []
+        scores = self.matrix[rows] @ self.prepare_query(query_embedding)
+        order = top_k_indices(scores, len(rows) if top_k is None else top_k)
+        return [(int(rows[i]), float(scores[i])) for i in order]
+
+    def search_batch(self, query_embeddings: np.ndarray, top_k: int, max_bytes: int = BATCH_SCORE_BYTES) -> Iterator[List[Tuple[int, float]]]:
+        """
+        Exact top_k for many queries at once, one result list per query row, in order.
+        Queries are scored with a matrix-matrix product in chunks sized so the score block
+        stays under max_bytes.
+        """
+        queries = normalize_rows(np.array(query_embeddings, dtype=np.float32, ndmin=2))
+        if not len(self):
+            for _ in range(len(queries)):
+                yield []
+            return
+        chunk = max(1, max_bytes // (4 * len(self)))
+        k = min(top_k, len(self))
+        for start in range(0, len(queries), chunk):
+            scores = queries[start:start + chunk] @ self.matrix.T
+            if k < len(self):
+                candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                candidates = np.tile(np.arange(len(self)), (len(scores), 1))
+            candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+            order = np.argsort(-candidate_scores, axis=1, kind="stable")
+            rows = np.take_along_axis(candidates, order, axis=1)
+            ranked_scores = np.take_along_axis(candidate_scores, order, axis=1)
+            for row_ids, row_scores in zip(rows, ranked_scores):
+                yield list(zip(row_ids.tolist(), row_scores.tolist()))
+
+
+def to_job_result(item: dict, score: float) -> dict:
+    """Shape a job record the way rank_jobs_by_similarity has always returned it."""
+    return {
+        "id": item["id"],
+        "title": item.get("title", ""),
+        "company": item.get("company_name", ""),
+        "tags": item.get("tags", []),
+        "location": item.get("location", ""),
+        "extensions": item.get("extensions", {}),
+        "apply_link": item.get("share_link", ""),
+        "description_snippet": item.get("description", "")[:300],
+        "score": float(score),
+    }
+
+
+def build_feed(engine: RankingEngine, hits: List[Tuple[int, float]], previous: Sequence[dict] = (), count: int = 0) -> List[dict]:
+    """
+    Turn search hits into the stored [{id, score}] feed. The first `count` entries of the
+    previous feed (already shown to the user) are kept in place so the user's cursor keeps
+    pointing at unseen jobs. Near-duplicate postings are clustered at ingestion and never
+    reach the index, so no per-user de-duplication is needed here.
+    """
+    shown = list(previous[:count])
+    seen_ids = {item["id"] for item in shown}
+    feed = shown
+    for row, score in hits:
+        job_id = engine.ids[row]
+        if job_id not in seen_ids:
+            seen_ids.add(job_id)
+            feed.append({"id": job_id, "score": score})
+    return feed
+
+
+def merge_feed(engine: RankingEngine, previous: Sequence[dict], count: int, new_hits: List[Tuple[int, float]]) -> List[dict]:
+    """
+    Merge freshly scored jobs into an existing feed without re-scoring it. The shown prefix
+    is untouched, unseen entries whose job is no longer in the index (expired) are dropped,
+    and the two sorted runs are merged so the result matches a full recompute.
+    """
+    tail = []
+    for item in previous[count:]:
+        row = engine.row_of(item["id"])
+        if row is not None:
+            tail.append((row, item["score"]))
+    merged = heapq.merge(tail, new_hits, key=lambda hit: -hit[1])
+    return build_feed(engine, list(merged), previous, count)[:max(RANKED_FEED_SIZE, count)]
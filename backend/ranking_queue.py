@@ -0,0 +1,149 @@
+import os
+import time
+import asyncio
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from firebase_admin import firestore
+
+RANKING_WORKERS = int(os.getenv("RANKING_WORKERS", "2"))
+# Every transition is stored on the user document as STATUS_FIELD, so any worker or container
+# can answer /ranking-status. A queued/running status older than RANKING_STALE_SECONDS belongs
+# to a process that died mid-ranking and is reported as failed.
+STATUS_FIELD = "ranking_status"
+RANKING_STALE_SECONDS = float(os.getenv("RANKING_STALE_SECONDS", "600"))
+
+QUEUED = "queued"
+RUNNING = "running"
+READY = "ready"
+FAILED = "failed"
+
+
+def store_status(db, uid: str, status: str, error: Optional[str] = None):
+    try:
+        db.collection("users").document(uid).update({
+            STATUS_FIELD: {"status": status, "error": error, "updated_at": firestore.SERVER_TIMESTAMP},
+        })
+    except Exception as e:
+        print(f"Could not store ranking status for {uid}: {e}")
+
+
+def stored_status(user_data: Optional[dict]) -> Optional[dict]:
+    """The ranking status kept on a user document, or None if it holds none."""
+    stored = (user_data or {}).get(STATUS_FIELD)
+    if not stored:
+        return None
+    status = {"status": stored.get("status"), "updated_at": stored.get("updated_at"), "error": stored.get("error")}
+    updated_at = status["updated_at"]
+    if status["status"] in (QUEUED, RUNNING) and isinstance(updated_at, datetime.datetime):
+        age = datetime.datetime.now(datetime.timezone.utc) - updated_at
+        if age.total_seconds() > RANKING_STALE_SECONDS:
+            status.update(status=FAILED, error="ranking was interrupted")
+    return status
+
+
+class _UserRanking:
+    def __init__(self):
+        self.status = QUEUED
+        self.incremental = True
+        self.rerun = False
+        self.updated_at = time.time()
+        self.error: Optional[str] = None
+
+
+class RankingQueue:
+    """
+    Runs compute_and_store_ranking off the request path on a bounded thread pool.
+    Requests for the same uid are coalesced: while a ranking is queued, further submits
+    merge into it; while it is running, one follow-up run is scheduled after it finishes.
+    A full recompute always wins over an incremental one when they are merged.
+    Status transitions are passed to record(uid, status, error) on a single thread, in order
+    and off the caller's thread (submit is called from request handlers). Only queued and
+    running users are kept in memory; a settled status is read back from the user document.
+    """
+
+    def __init__(self, run: Callable[[str, bool], None], max_workers: int = RANKING_WORKERS, record: Optional[Callable[[str, str, Optional[str]], None]] = None):
+        self._run = run
+        self._record = record
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ranking")
+        self._recorder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ranking-status")
+        self._lock = threading.Lock()
+        self._users: Dict[str, _UserRanking] = {}
+        self._listeners: Dict[str, list] = {}
+
+    def submit(self, uid: str, incremental: bool = False):
+        with self._lock:
+            state = self._users.get(uid)
+            if state is not None and state.status == QUEUED:
+                state.incremental = state.incremental and incremental
+                return
+            if state is not None and state.status == RUNNING:
+                state.rerun = True
+                state.incremental = state.incremental and incremental
+                return
+            state = _UserRanking()
+            state.incremental = incremental
+            self._users[uid] = state
+        self._report(uid, QUEUED)
+        self._pool.submit(self._work, uid, state)
+
+    def _report(self, uid: str, status: str, error: Optional[str] = None):
+        if self._record is not None:
+            self._recorder.submit(self._record, uid, status, error)
+
+    def _work(self, uid: str, state: _UserRanking):
+        self._report(uid, RUNNING)
+        while True:
+            with self._lock:
+                state.status = RUNNING
+                state.updated_at = time.time()
+                incremental = state.incremental
+                state.incremental = True
+                state.rerun = False
+            try:
+                self._run(uid, incremental)
+                error = None
+            except Exception as e:
+                error = str(e)
+            with self._lock:
+                if state.rerun:
+                    continue
+                state.status = FAILED if error else READY
+                state.error = error
+                state.updated_at = time.time()
+                listeners = self._listeners.pop(uid, [])
+                if self._users.get(uid) is state:
+                    del self._users[uid]
+            self._report(uid, state.status, error)
+            for loop, future in listeners:
+                loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(state.status))
+            return
+
+    def status(self, uid: str, user_data: Optional[dict] = None) -> Optional[dict]:
+        """uid's queued or running ranking in this process, else the status stored on user_data (None if neither)."""
+        with self._lock:
+            state = self._users.get(uid)
+            if state is not None:
+                return {"status": state.status, "updated_at": state.updated_at, "error": state.error}
+        return stored_status(user_data)
+
+    def is_pending(self, uid: str) -> bool:
+        with self._lock:
+            state = self._users.get(uid)
+            return state is not None and state.status in (QUEUED, RUNNING)
+
+    async def wait(self, uid: str, timeout: float) -> Optional[str]:
+        """Wait (without blocking the event loop) until uid's ranking settles; returns its status."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._users.get(uid)
+            if state is None:
+                return None
+            future = loop.create_future()
+            self._listeners.setdefault(uid, []).append((loop, future))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                return state.status
@@ -0,0 +1,289 @@
+import os
+import time
+import asyncio
+import threading
+import zipfile
+import subprocess
+import multiprocessing
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import pytesseract
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+from blocking_io import run_blocking
+
+# Pages are rendered and OCR'd in a process pool shared by every upload. At most
+# OCR_MAX_PENDING pages are queued or running at once; further pages wait up to
+# OCR_QUEUE_TIMEOUT seconds for a slot and the upload fails with OCRBusy after that. Slots and
+# pages are awaited on the event loop, so an upload waiting on OCR holds no thread. Workers
+# start from a fork server (spawn where there is none): forking the server after gRPC has
+# started its threads can deadlock the child.
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+OCR_MAX_PENDING = int(os.getenv("OCR_MAX_PENDING", str(OCR_WORKERS * 4)))
+OCR_QUEUE_TIMEOUT = float(os.getenv("OCR_QUEUE_TIMEOUT", "30"))
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+# Born-digital PDFs carry a text layer; a page is only OCR'd when its text layer has fewer
+# than TEXT_LAYER_MIN_CHARS letters and digits (scans, image-only pages, broken font maps).
+TEXT_LAYER_MIN_CHARS = int(os.getenv("TEXT_LAYER_MIN_CHARS", "100"))
+PDFTOTEXT_TIMEOUT = float(os.getenv("PDFTOTEXT_TIMEOUT", "20"))
+# Part of the parse cache key for extracted text; bump whenever extraction output changes
+EXTRACTOR_VERSION = 1
+# Uncompressed size limit of one DOCX XML part, against zip bombs
+DOCX_MAX_PART_BYTES = int(os.getenv("DOCX_MAX_PART_BYTES", str(50 * 1024 * 1024)))
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+
+class OCRBusy(RuntimeError):
+    """Raised when the OCR pool stays saturated for longer than OCR_QUEUE_TIMEOUT."""
+
+
+class UnsupportedDocument(ValueError):
+    """Raised when an upload is neither a PDF nor a DOCX, whatever its filename says."""
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_slots = asyncio.Semaphore(OCR_MAX_PENDING)
+_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+_tesseract_cmd: Optional[str] = None
+_poppler_path: Optional[str] = None
+
+
+def configure(tesseract_cmd: Optional[str] = None, poppler_path: Optional[str] = None):
+    """Set binary locations (Windows installs); call before the first extraction."""
+    global _tesseract_cmd, _poppler_path
+    _tesseract_cmd = tesseract_cmd
+    _poppler_path = poppler_path
+
+
+def _init_worker(tesseract_cmd: Optional[str]):
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=OCR_WORKERS,
+                mp_context=multiprocessing.get_context(_START_METHOD),
+                initializer=_init_worker,
+                initargs=(_tesseract_cmd,),
+            )
+        return _pool
+
+
+def _ocr_page(pdf_path: str, page: int, poppler_path: Optional[str], dpi: int) -> Tuple[str, float, float]:
+    """Render one page (1-based) and OCR it; returns (text, render seconds, OCR seconds)."""
+    started = time.perf_counter()
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=page, last_page=page, poppler_path=poppler_path)
+    rendered = time.perf_counter()
+    text = "".join(pytesseract.image_to_string(image) for image in images)
+    return text, rendered - started, time.perf_counter() - rendered
+
+
+def page_count(pdf_path: str) -> int:
+    return int(pdfinfo_from_path(pdf_path, poppler_path=_poppler_path)["Pages"])
+
+
+async def ocr_pages(pdf_path: str, pages: List[int]) -> List[dict]:
+    """OCR the given pages in parallel on the shared pool; results come back in page order."""
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    futures = []
+    try:
+        for page in pages:
+            try:
+                await asyncio.wait_for(_slots.acquire(), OCR_QUEUE_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise OCRBusy(f"OCR pool saturated ({OCR_MAX_PENDING} pages pending)")
+            try:
+                future = pool.submit(_ocr_page, pdf_path, page, _poppler_path, OCR_DPI)
+            except BaseException:
+                _slots.release()
+                raise
+            # The slot frees when the worker finishes, even if this upload stopped waiting
+            future.add_done_callback(lambda _: loop.call_soon_threadsafe(_slots.release))
+            futures.append((page, asyncio.wrap_future(future)))
+        results = []
+        for page, future in futures:
+            text, render_s, ocr_s = await future
+            results.append({"page": page, "text": text, "method": "ocr", "render_ms": round(render_s * 1000, 1), "ocr_ms": round(ocr_s * 1000, 1)})
+        return results
+    except BaseException:
+        for _, future in futures:
+            future.cancel()
+        raise
+
+
+def text_layer(pdf_path: str) -> Optional[List[str]]:
+    """Embedded text of every page via poppler's pdftotext, or None if it cannot be read."""
+    binary = os.path.join(_poppler_path, "pdftotext") if _poppler_path else "pdftotext"
+    try:
+        result = subprocess.run([binary, "-layout", "-enc", "UTF-8", pdf_path, "-"], capture_output=True, timeout=PDFTOTEXT_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"pdftotext unavailable, falling back to OCR: {e}")
+        return None
+    if result.returncode != 0:
+        return None
+    # pdftotext ends every page with a form feed
+    return result.stdout.decode("utf-8", errors="replace").split("\f")[:-1]
+
+
+def is_dense(text: str) -> bool:
+    return sum(ch.isalnum() for ch in text) >= TEXT_LAYER_MIN_CHARS
+
+
+def _layer_pages(pdf_path: str) -> List[dict]:
+    """Every page of a PDF as {page, text, method: "text", ms}, empty where there is no text layer."""
+    started = time.perf_counter()
+    count = page_count(pdf_path)
+    embedded = text_layer(pdf_path)
+    layer_ms = round((time.perf_counter() - started) * 1000, 1)
+    if embedded is None or len(embedded) != count:
+        embedded = [""] * count
+    return [{"page": number, "text": text + "\n", "method": "text", "ms": layer_ms} for number, text in enumerate(embedded, 1)]
+
+
+async def extract_pdf(pdf_path: str) -> Tuple[str, List[dict]]:
+    """
+    Text of a PDF plus per-page stats ({page, method, chars, ms}). Pages come from the text
+    layer when it is dense enough and from OCR otherwise.
+    """
+    started = time.perf_counter()
+    pages = await run_blocking(_layer_pages, pdf_path)
+    sparse = [page["page"] for page in pages if not is_dense(page["text"])]
+    for result in await ocr_pages(pdf_path, sparse) if sparse else []:
+        result["ms"] = round(result["render_ms"] + result["ocr_ms"], 1)
+        pages[result["page"] - 1] = result
+
+    text = "".join(page["text"] for page in pages)
+    for page in pages:
+        page["chars"] = len(page.pop("text"))
+    print(f"Extracted {len(pages)} page(s) from {os.path.basename(pdf_path)} in {(time.perf_counter() - started) * 1000:.0f} ms "
+          f"({len(pages) - len(sparse)} text layer, {len(sparse)} OCR): "
+          + ", ".join(f"p{page['page']} {page['method']} {page['ms']:.0f} ms" for page in pages))
+    return text, pages
+
+
+def sniff_head(head: bytes) -> Optional[str]:
+    """"pdf" or "zip" (a DOCX candidate) from the first bytes of a file, None otherwise."""
+    if b"%PDF-" in head[:1024]:  # readers accept a header anywhere in the first KB
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        return "zip"
+    return None
+
+
+def sniff(path: str) -> Optional[str]:
+    """"pdf" or "docx" from the file's bytes, or None for anything else."""
+    with open(path, "rb") as f:
+        kind = sniff_head(f.read(1024))
+    if kind == "pdf":
+        return kind
+    if kind == "zip":
+        try:
+            with zipfile.ZipFile(path) as archive:
+                if "word/document.xml" in archive.namelist():
+                    return "docx"
+        except zipfile.BadZipFile:
+            pass
+    return None
+
+
+def _paragraph_text(paragraph) -> str:
+    parts = []
+    for node in paragraph.iter():
+        if node.tag == _W + "t":  # w:delText (tracked deletions) is skipped
+            parts.append(node.text or "")
+        elif node.tag == _W + "tab":
+            parts.append("\t")
+        elif node.tag in (_W + "br", _W + "cr"):
+            parts.append("\n")
+    return "".join(parts)
+
+
+def docx_lines(source) -> List[str]:
+    """
+    Lines of one WordprocessingML part, parsed incrementally: a line per paragraph and per
+    table row (cells joined with " | ", nested tables inlined into their cell). Elements are
+    cleared once read, so memory stays bounded by the largest paragraph or row.
+    """
+    lines: List[str] = []
+    rows: List[List[str]] = []   # open table rows, innermost last
+    cells: List[List[str]] = []  # open table cells, innermost last
+    fallback = 0                 # inside mc:Fallback, which repeats the mc:Choice content
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag == _MC_FALLBACK:
+                fallback += 1
+            elif tag == _W + "tr" and not fallback:
+                rows.append([])
+            elif tag == _W + "tc" and not fallback:
+                cells.append([])
+            continue
+        if tag == _MC_FALLBACK:
+            fallback -= 1
+        elif fallback:
+            continue
+        elif tag == _W + "p":
+            text = _paragraph_text(elem).strip()
+            if text:
+                (cells[-1] if cells else lines).append(text)
+        elif tag == _W + "tc":
+            cell = " ".join(cells.pop())
+            if rows:
+                rows[-1].append(cell)
+        elif tag == _W + "tr":
+            row = " | ".join(cell for cell in rows.pop() if cell)
+            if row:
+                (cells[-1] if cells else lines).append(row)
+        else:
+            continue
+        elem.clear()
+    return lines
+
+
+def _docx_parts(archive: zipfile.ZipFile) -> List[str]:
+    """Headers (where templates put name and contact details), then the body."""
+    names = archive.namelist()
+    headers = sorted(name for name in names if name.startswith("word/header") and name.endswith(".xml"))
+    return headers + ["word/document.xml"]
+
+
+def extract_docx(docx_path: str) -> Tuple[str, List[dict]]:
+    """Text of a DOCX read straight from its XML, plus per-part stats ({part, method, chars, ms})."""
+    started = time.perf_counter()
+    parts = []
+    chunks = []
+    with zipfile.ZipFile(docx_path) as archive:
+        for name in _docx_parts(archive):
+            if archive.getinfo(name).file_size > DOCX_MAX_PART_BYTES:
+                raise UnsupportedDocument(f"{name} exceeds {DOCX_MAX_PART_BYTES} bytes")
+            part_started = time.perf_counter()
+            with archive.open(name) as source:
+                text = "".join(line + "\n" for line in docx_lines(source))
+            chunks.append(text)
+            parts.append({"part": name, "method": "docx", "chars": len(text), "ms": round((time.perf_counter() - part_started) * 1000, 1)})
+    print(f"Extracted {len(parts)} part(s) from {os.path.basename(docx_path)} in {(time.perf_counter() - started) * 1000:.0f} ms: "
+          + ", ".join(f"{part['part']} {part['chars']} chars {part['ms']:.0f} ms" for part in parts))
+    return "".join(chunks), parts
+
+
+async def extract_text(path: str) -> Tuple[str, str, List[dict]]:
+    """
+    Text of an uploaded resume, dispatched on its content: (kind, text, stats). PDFs go through
+    the text layer and OCR; DOCX files are read from their XML and never OCR'd.
+    """
+    kind = await run_blocking(sniff, path)
+    if kind == "pdf":
+        return (kind,) + await extract_pdf(path)
+    if kind == "docx":
+        return (kind,) + await run_blocking(extract_docx, path)
+    raise UnsupportedDocument("Only PDF and DOCX files are supported")
@@ -34,7 +34,7 @@ async def main():
         
     try:
         # 2. Fetch Job Details from Firestore (collection "resumes")
-        job_doc = db.collection("resumes").document(job_id).get()
+        job_doc = db.collection("resumes").document(job_id).get(field_paths=["apply_options", "share_link"])
         if not job_doc.exists:
             print(json.dumps({"type": "error", "message": "Job not found"}))
             return
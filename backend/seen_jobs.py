@@ -0,0 +1,119 @@
+import os
+import hashlib
+import numpy as np
+from typing import Dict, Iterable, List, Optional
+from firebase_admin import firestore
+
+from job_cards import GET_ALL_CHUNK
+from ranked_feed import FeedReader
+
+# Jobs a user has been shown, kept in their own document users/{uid}/seen_jobs/packed as
+# SEEN_FIELD: packed little-endian 64-bit hashes of the job ids, oldest first. Ranking excludes
+# them, so a new resume (which resets the feed and its cursor) never resurfaces swiped or
+# matched jobs. The set is written only when it grows, and stays out of the user document
+# that every request reads. At the cap the oldest hashes are dropped; 20000 jobs is 160 KB.
+SEEN_COLLECTION = "seen_jobs"
+SEEN_DOCUMENT = "packed"
+SEEN_FIELD = "hashes"
+# Where sets were kept on the user document at first; merged into the seen document and
+# deleted by the user's next cursor flush or resume upload.
+LEGACY_SEEN_FIELD = "seen_jobs"
+SEEN_JOBS_MAX = int(os.getenv("SEEN_JOBS_MAX", "20000"))
+_DTYPE = np.dtype("<u8")
+
+
+def job_hash(job_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(job_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def unpack_seen(blob: Optional[bytes]) -> np.ndarray:
+    return np.frombuffer(blob, dtype=_DTYPE) if blob else np.empty(0, dtype=_DTYPE)
+
+
+def _append(blob: Optional[bytes], values: Iterable[int], limit: int) -> bytes:
+    seen = unpack_seen(blob)
+    known = set(seen.tolist())
+    fresh = []
+    for value in values:
+        if value not in known:
+            known.add(value)
+            fresh.append(value)
+    if not fresh and len(seen) <= limit:
+        return seen.tobytes()
+    merged = np.concatenate([seen, np.asarray(fresh, dtype=_DTYPE)])
+    return merged[-limit:].tobytes() if limit else b""
+
+
+def add_seen(blob: Optional[bytes], job_ids: Iterable[str], limit: int = SEEN_JOBS_MAX) -> bytes:
+    """The seen set with job_ids appended (duplicates skipped), trimmed to the newest `limit`."""
+    return _append(blob, (job_hash(job_id) for job_id in job_ids), limit)
+
+
+def merge_seen(blob: Optional[bytes], legacy: Optional[bytes], limit: int = SEEN_JOBS_MAX) -> bytes:
+    """A seen set combined with a legacy one from the user document (legacy entries first)."""
+    if not legacy:
+        return blob or b""
+    return _append(legacy, unpack_seen(blob).tolist(), limit)
+
+
+def seen_ref(db, uid: str):
+    return db.collection("users").document(uid).collection(SEEN_COLLECTION).document(SEEN_DOCUMENT)
+
+
+def load_seen(db, uid: str, user_data: Optional[dict] = None) -> Optional[bytes]:
+    """A user's seen set (one read), including any legacy set still on user_data."""
+    doc = seen_ref(db, uid).get()
+    blob = doc.to_dict().get(SEEN_FIELD) if doc.exists else None
+    return merge_seen(blob, (user_data or {}).get(LEGACY_SEEN_FIELD)) or None
+
+
+def load_seen_many(db, uids: List[str]) -> Dict[str, bytes]:
+    """Seen sets of many users, one get_all per GET_ALL_CHUNK users; users without one are absent."""
+    found = {}
+    for start in range(0, len(uids), GET_ALL_CHUNK):
+        refs = [seen_ref(db, uid) for uid in uids[start:start + GET_ALL_CHUNK]]
+        for doc in db.get_all(refs, field_paths=[SEEN_FIELD]):
+            if doc.exists and doc.to_dict().get(SEEN_FIELD):
+                found[doc.reference.parent.parent.id] = doc.to_dict()[SEEN_FIELD]
+    return found
+
+
+class SeenIndex:
+    """job hash -> engine row, built once per engine, so a seen set maps to rows in O(1) per entry."""
+
+    def __init__(self, ids):
+        self.rows: Dict[int, int] = {job_hash(job_id): row for row, job_id in enumerate(ids)}
+
+    def rows_of(self, blob: Optional[bytes]) -> np.ndarray:
+        rows = self.rows
+        found = [rows[value] for value in unpack_seen(blob).tolist() if value in rows]
+        return np.asarray(sorted(found), dtype=np.int64)
+
+
+def seen_rows(engine, blob: Optional[bytes]) -> Optional[np.ndarray]:
+    """Engine rows of the jobs in a seen set (sorted), or None if there is nothing to exclude."""
+    if not blob or not len(engine):
+        return None
+    if engine.seen_index is None:
+        engine.seen_index = SeenIndex(engine.ids)
+    rows = engine.seen_index.rows_of(blob)
+    return rows if len(rows) else None
+
+
+def carry_seen(db, uid: str):
+    """
+    Before a user's profile and feed are replaced, add the shown prefix of the old feed (jobs
+    served before seen sets were recorded) and any legacy set to the seen document. Writes
+    only if that changes it.
+    """
+    doc = db.collection("users").document(uid).get(field_paths=[LEGACY_SEEN_FIELD, "count", "ranked_feed", "ranked_jobs"])
+    if not doc.exists:
+        return
+    data = doc.to_dict()
+    ref = seen_ref(db, uid)
+    stored = ref.get()
+    blob = stored.to_dict().get(SEEN_FIELD) if stored.exists else None
+    shown = FeedReader(db, uid, data).slice(0, data.get("count", 0))
+    updated = add_seen(merge_seen(blob, data.get(LEGACY_SEEN_FIELD)), [item["id"] for item in shown])
+    if updated and updated != (blob or b""):
+        ref.set({SEEN_FIELD: updated, "updated_at": firestore.SERVER_TIMESTAMP})
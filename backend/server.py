@@ -7,35 +7,63 @@ if sys.platform == 'win32':
 
 import json
 from pydoc import doc
-import tempfile
 import numpy as np
-import pytesseract
-from pdf2image import convert_from_path
 
 from google import genai
 from google.genai import types
-from sklearn.metrics.pairwise import cosine_similarity
 from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, Header, UploadFile, File, HTTPException, WebSocket, WebSocketDisconnect
-from fastapi.responses import StreamingResponse
+from fastapi import Depends, FastAPI, Header, Query, Request, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple, Union
 import firebase_admin
 from firebase_admin import credentials, firestore, auth
 from google.api_core.exceptions import ResourceExhausted
 
+from ranking import RANKED_FEED_SIZE, RankingEngine, build_feed, to_job_result
+from job_snapshot import feed_behind, get_snapshot, incremental_feed
+from query_embeddings import EMBEDDING_DIM, EMBEDDING_MODEL, profile_text, query_embedding_for
+from ranking_queue import QUEUED, READY, RUNNING, STATUS_FIELD, RankingQueue, store_status, stored_status
+from job_filters import filtered_rows, filters_from_params
+from ranked_feed import FeedReader, clear_feed, write_feed
+from job_cards import job_card_cache, load_description, load_job_cards
+from card_prefetch import CardPrefetcher, prefetch_metrics
+from feed_cursor import CursorBuffer
+from blocking_io import iterate_blocking, run_blocking
+from matches import MATCHES_PAGE_SIZE, InvalidCursor, clear_matches, list_matches, mark_applying, record_match
+from swipes import MAX_SWIPE_BATCH, apply_swipes
+from seen_jobs import LEGACY_SEEN_FIELD, carry_seen, load_seen, seen_rows
+import resume_text
+from resume_text import EXTRACTOR_VERSION, OCRBusy, UnsupportedDocument
+from parse_cache import ParseCache, prompt_version
+from uploads import RESUME_MAX_BYTES, MalformedUpload, UploadTooLarge, declared_too_large, receive_upload
+
 # Load environment variables
 load_dotenv()
 
 
 # Tesseract and Poppler paths
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+TESSERACT_CMD = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 POPPLER_PATH = r"C:\tools\poppler-26.02.0\Library\bin"
+resume_text.configure(tesseract_cmd=TESSERACT_CMD, poppler_path=POPPLER_PATH)
 SYSTEM_PROMPT_PATH = os.path.join(os.path.dirname(__file__),  "system_prompt.txt")
+JOB_SNAPSHOT_DIR = os.getenv("JOB_SNAPSHOT_DIR", os.path.join(os.path.dirname(__file__), "job_snapshot"))
+PARSE_CACHE_DIR = os.getenv("PARSE_CACHE_DIR", os.path.join(os.path.dirname(__file__), "resume_cache"))
+RESUME_PARSE_MODEL = "gemini-3-flash-preview"
+# User document fields never returned by /me
+PRIVATE_USER_FIELDS = (LEGACY_SEEN_FIELD, "query_embedding")
+parse_cache = ParseCache(PARSE_CACHE_DIR)
 
 app = FastAPI(title="Resume Parser & Job Recommendation API")
 
+@app.middleware("http")
+async def reject_oversized_resumes(request, call_next):
+    """Refuse oversized uploads from Content-Length, before the multipart body is read."""
+    if request.url.path == "/parse-resume" and declared_too_large(request.headers.get("content-length")):
+        return JSONResponse(status_code=413, content={"detail": f"Resume exceeds {RESUME_MAX_BYTES // (1024 * 1024)} MB"})
+    return await call_next(request)
+
 cred_path = os.path.join(os.path.dirname(__file__), "firebase.json")
 cred = credentials.Certificate(cred_path)
 firebase_admin.initialize_app(cred)
@@ -81,34 +109,62 @@ def get_current_user(authorization: str = Header(...)):
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """Extract text from PDF using OCR."""
+async def extract_resume_text(path: str) -> Tuple[str, str]:
+    """(kind, text) of an uploaded resume, sniffed from its bytes: PDFs via text layer + parallel OCR, DOCX from its XML."""
     try:
-        images = convert_from_path(pdf_path, poppler_path=POPPLER_PATH)
-        text_content = ""
-        for image in images:
-            text_content += pytesseract.image_to_string(image)
-        return text_content
+        kind, text_content, _ = await resume_text.extract_text(path)  # logs each page's / part's timing
+        return kind, text_content
+    except UnsupportedDocument as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OCRBusy:
+        raise HTTPException(status_code=503, detail="Resume processing is busy, please retry shortly")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"PDF extraction error: {str(e)}")
-
-def parse_resume_with_llm(text_content: str) -> dict:
-    """Parse resume text to JSON using Gemini LLM."""
-    if not os.getenv("GEMINI_API_KEY"):
-         raise HTTPException(status_code=500, detail="GEMINI_API_KEY not found in environment")
-    
+        raise HTTPException(status_code=500, detail=f"Resume extraction error: {str(e)}")
+
+async def cached_resume_text(path: str, digest: str) -> Tuple[str, str]:
+    """extract_resume_text, reusing the text of an earlier upload with the same bytes."""
+    cached = await run_blocking(parse_cache.get, "text", digest, EXTRACTOR_VERSION)
+    if cached is not None:
+        print(f"Resume text cache hit for {digest[:12]}")
+        return cached["kind"], cached["text"]
+    kind, text_content = await extract_resume_text(path)
+    await run_blocking(parse_cache.put, {"kind": kind, "text": text_content}, "text", digest, EXTRACTOR_VERSION)
+    return kind, text_content
+
+def read_system_prompt() -> str:
     if not os.path.exists(SYSTEM_PROMPT_PATH):
         raise HTTPException(status_code=500, detail="system_prompt.txt not found")
 
     with open(SYSTEM_PROMPT_PATH, "r", encoding="utf-8") as f:
-        system_prompt = f.read()
+        return f.read()
+
+def cached_resume_parse(digest: str, text_content: str) -> dict:
+    """parse_resume_with_llm, reusing the parse of the same bytes under the same prompt and model."""
+    system_prompt = read_system_prompt()
+    key = ("parsed", digest, prompt_version(system_prompt), RESUME_PARSE_MODEL)
+    parsed_data = parse_cache.get(*key)
+    if parsed_data is not None:
+        print(f"Resume parse cache hit for {digest[:12]}")
+        return parsed_data
+    parsed_data = parse_resume_with_llm(text_content, system_prompt)
+    parse_cache.put({
+        "info_dict": parsed_data.get("info_dict", {}),
+        "job_dict": parsed_data.get("job_dict", {}),
+        "new_keys_tracker": parsed_data.get("new_keys_tracker", {}),
+    }, *key)
+    return parsed_data
+
+def parse_resume_with_llm(text_content: str, system_prompt: str) -> dict:
+    """Parse resume text to JSON using Gemini LLM."""
+    if not os.getenv("GEMINI_API_KEY"):
+         raise HTTPException(status_code=500, detail="GEMINI_API_KEY not found in environment")
 
     client = genai.Client()
     try:
         prompt = f"{system_prompt}\n\nResume Text:\n{text_content}"
         
         response = client.models.generate_content(
-            model="gemini-3-flash-preview", 
+            model=RESUME_PARSE_MODEL, 
             contents=prompt,
         )
         
@@ -133,76 +189,56 @@ def create_embedding(text: str) -> np.ndarray:
     
     try:
         response = client.models.embed_content(
-            model="gemini-embedding-2",
+            model=EMBEDDING_MODEL,
             contents=text,
-            config=types.EmbedContentConfig(output_dimensionality=768)
+            config=types.EmbedContentConfig(output_dimensionality=EMBEDDING_DIM)
         )
         return np.array(response.embeddings[0].values).reshape(1, -1)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Embedding error: {str(e)}")
 
 
-def load_job_database() -> List[dict]:
-    """Load the job database with embeddings."""
+def load_job_index() -> RankingEngine:
+    """Load the job embeddings from the local mmap snapshot, syncing new jobs from Firestore."""
     try:
-        jobs_ref=db.collection("resumes").stream()
-        jobs = []
-        for doc in jobs_ref:
-            data = doc.to_dict()
-            data["id"] = doc.id   # keep document ID
-            jobs.append(data)
-
-        if not jobs:
-            raise HTTPException(status_code=404, detail="No jobs found in Firestore")
-
-        return jobs
-
+        engine = get_snapshot(JOB_SNAPSHOT_DIR).engine(db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Firestore error: {str(e)}")
 
+    if not len(engine):
+        raise HTTPException(status_code=404, detail="No jobs found in Firestore")
+
+    return engine
+
 
 def rank_jobs_by_similarity(
     job_dict: dict,
-    database: List[dict],
+    database: Union[List[dict], RankingEngine],
     top_k: int = 50,
+    query_embedding: Optional[np.ndarray] = None,
+    filters: Optional[dict] = None,
     ) -> List[dict]:
-    """Rank jobs by cosine similarity to user's job_dict."""
-    job_text = json.dumps(job_dict, sort_keys=True)
-    query_embedding = create_embedding(job_text)
-
-    results = []
-
-    for item in database:
-        embedding = item.get("embedding")
-        if not embedding:
-            continue  # skip jobs without embeddings
-
-        item_embedding = np.array(embedding).reshape(1, -1)
-        score = cosine_similarity(query_embedding, item_embedding)[0][0]
-
-        job_result = {
-            "id": item["id"],
-            "title": item.get("title", ""),
-            "company": item.get("company_name", ""),
-            "tags": item.get("tags", []),
-            "location": item.get("location", ""),
-            "extensions": item.get("extensions", {}),   
-            "apply_link": item.get("share_link", ""),
-            "description_snippet": item.get("description", "")[:300],
-            "score": float(score),
-        }
+    """Rank jobs by cosine similarity to user's job_dict, scoring only jobs that pass filters."""
+    if query_embedding is None:
+        query_embedding = create_embedding(profile_text(job_dict))
 
-        results.append(job_result)
+    engine = database if isinstance(database, RankingEngine) else RankingEngine.from_jobs(database)
+    hits = engine.search(query_embedding, top_k, rows=filtered_rows(engine, filters))
+    results = [to_job_result(engine.metadata[row], score) for row, score in hits]
 
-    # Sort by similarity score
-    results.sort(key=lambda x: x["score"], reverse=True)
     print(f"Top job match score: {results[0]['score'] if results else 'N/A'}")
     print(f"Top company name: {results[0]['company'] if results else 'N/A'}")
 
-    return results[:top_k]
+    return results
 
 
-def compute_and_store_ranking(uid):
+def compute_and_store_ranking(uid, incremental: bool = False):
+    """
+    Rank jobs for a user and store the feed in the paged ranked_feed store. With incremental=True only jobs added since
+    ranked_through (the snapshot watermark the feed was last ranked over) are scored (against the stored query embedding) and merged into the
+    existing feed; /save-profile queues that when the snapshot has moved past the feed. Profile or filter changes need the
+    full recompute. The user's job_filters are applied before scoring, so only matching jobs are ever scored.
+    """
     try:
         print(f"Starting ranking for user {uid}...")
         user_doc = db.collection("users").document(uid).get()
@@ -217,101 +253,161 @@ def compute_and_store_ranking(uid):
             print(f"No job_dict found for user {uid}. Skipping ranking.")
             return
 
-        database = load_job_database()
-        print(f"Loaded {len(database)} jobs from database.")
-        
-        # Rank jobs and get objects with IDs and scores
-        ranked_jobs = rank_jobs_by_similarity(job_dict, database, top_k=3000)
-        print(f"Ranking complete. Top score: {ranked_jobs[0]['score'] if ranked_jobs else 'N/A'}")
-
-        # De-duplicate by title: Keep only the first occurrence of each title
-        seen_titles = set()
-        unique_ranked_jobs = []
-        for job in ranked_jobs:
-            title = job.get("title", "").strip().lower()
-            if title and title not in seen_titles:
-                seen_titles.add(title)
-                unique_ranked_jobs.append(job)
-        
-        print(f"De-duplicated: {len(ranked_jobs)} -> {len(unique_ranked_jobs)} unique jobs")
+        database = load_job_index()
+        print(f"Loaded {len(database)} jobs from snapshot.")
+
+        # Stored query vector is reused while the profile hash matches; otherwise Gemini is called
+        query_embedding, embedding_updates = query_embedding_for(job_dict, user_data, create_embedding)
+        allowed = filtered_rows(database, user_data.get("job_filters"))
+        seen = seen_rows(database, load_seen(db, uid, user_data))  # swiped jobs from earlier feeds never come back
+        previous = FeedReader(db, uid, user_data)
+        count = cursor_buffer.current(uid, user_data.get("count", 0), user_data.get("updated_at"))  # includes unflushed swipes
+
+        if incremental and not embedding_updates and user_data.get("ranked_through"):
+            ranked_jobs_data = incremental_feed(database, query_embedding, previous.slice(0), count, allowed, seen, user_data["ranked_through"])
+            write_feed(db, uid, ranked_jobs_data, previous.pointer, {"ranking_updated_at": firestore.SERVER_TIMESTAMP, "ranked_through": database.synced_through})
+            print(f"Incrementally merged new jobs for {uid} ({len(ranked_jobs_data)} in feed)")
+            return
 
-        # Store IDs and scores
-        ranked_jobs_data = [{"id": job["id"], "score": job["score"]} for job in unique_ranked_jobs]
+        # Rank jobs and get (row, score) hits
+        hits = database.search(query_embedding, RANKED_FEED_SIZE, rows=allowed, exclude=seen)
+        print(f"Ranking complete. Top score: {hits[0][1] if hits else 'N/A'}")
 
-        db.collection("users").document(uid).update({
-            "ranked_jobs": ranked_jobs_data, # Store full objects
-            "ranking_updated_at": firestore.SERVER_TIMESTAMP
+        # Keep the jobs the user has already been shown (near-duplicates were clustered at ingestion)
+        ranked_jobs_data = build_feed(database, hits, previous.slice(0, count), count)
+        print(f"Feed built: {len(ranked_jobs_data)} jobs")
+
+        write_feed(db, uid, ranked_jobs_data, previous.pointer, {
+            "ranking_updated_at": firestore.SERVER_TIMESTAMP,
+            "ranked_through": database.synced_through,
+            **embedding_updates,
         })
-        print(f"Successfully updated ranked_jobs for {uid}")
+        print(f"Successfully updated ranked feed for {uid}")
 
 
     except Exception as e:
         print(f"Error in compute_and_store_ranking: {str(e)}")
         import traceback
         traceback.print_exc()
+        raise
+
+
+# Swipe cursors are written behind: coalesced per user and flushed every few swipes or seconds
+cursor_buffer = CursorBuffer(lambda: db)
+
+# Rankings run on a bounded background pool so uploads never wait for them; their status is
+# kept on the user document so every worker can report it
+ranking_queue = RankingQueue(compute_and_store_ranking, record=lambda uid, status, error: store_status(db, uid, status, error))
+RANKING_WAIT_SECONDS = float(os.getenv("RANKING_WAIT_SECONDS", "20"))
 
 
 @app.get("/save-profile")
-async def save_profile(user: dict = Depends(get_current_user)):
+async def save_profile(
+    user: dict = Depends(get_current_user),
+    remote: Optional[bool] = None,
+    schedule_type: Optional[List[str]] = Query(None),
+    location: Optional[List[str]] = Query(None),
+    clear_filters: bool = False,
+    ):
     """
     Save profile and get ranked job recommendations.
     
     Takes job_dict, creates embedding, and returns jobs ranked by similarity.
+    Optional remote / schedule_type / location parameters replace the user's job filters
+    (clear_filters=true removes them); a change re-ranks the feed over matching jobs only.
     """
     try:
-        user_doc = db.collection("users").document(user["uid"]).get()
+        filters = {} if clear_filters else filters_from_params(remote, schedule_type, location)
+        if filters is not None:
+            user_ref = db.collection("users").document(user["uid"])
+            user_doc = await run_blocking(user_ref.get)
+            if user_doc.exists and (user_doc.to_dict().get("job_filters") or {}) != filters:
+                await run_blocking(user_ref.update, {"job_filters": filters})
+                ranking_queue.submit(user["uid"])
+
+        # A ranking may still be running for a fresh upload; give it a bounded head start
+        ranking_status = None
+        if ranking_queue.is_pending(user["uid"]):
+            ranking_status = await ranking_queue.wait(user["uid"], RANKING_WAIT_SECONDS)
+            if ranking_status in (QUEUED, RUNNING):
+                return {
+                    "success": True,
+                    "ranked_jobs": [],
+                    "total_jobs": 0,
+                    "ranking_status": ranking_status
+                }
+
+        user_doc = await run_blocking(db.collection("users").document(user["uid"]).get)
         if not user_doc.exists:
             print(f"User document not found for uid: {user['uid']}")
             raise HTTPException(status_code=404, detail="User data not found")
             
         user_data = user_doc.to_dict()
-        count = user_data.get("count", 0)
-        # Fetch ranked_jobs list which contains {id, score}
-        ranked_jobs_data = user_data.get("ranked_jobs", [])
+        epoch = user_data.get("updated_at")
+        count = cursor_buffer.current(user["uid"], user_data.get("count", 0), epoch)
+        # Ranked feed of {id, score}, read page by page from the ranked_feed store
+        ranked_jobs_data = FeedReader(db, user["uid"], user_data)
+
+        # No feed yet because another worker is still ranking it: the client polls /ranking-status
+        stored = stored_status(user_data)
+        if ranking_status is None and not len(ranked_jobs_data) and stored and stored["status"] in (QUEUED, RUNNING):
+            return {"success": True, "ranked_jobs": [], "total_jobs": 0, "ranking_status": stored["status"]}
+
+        # Jobs synced since this feed was ranked are merged in the background (no-op when already queued)
+        if ranking_status is None and feed_behind(user_data, get_snapshot(JOB_SNAPSHOT_DIR).current()):
+            ranking_queue.submit(user["uid"], incremental=True)
         
         print(f"DEBUG: User {user['uid']} - Count: {count}, Total Ranked Jobs: {len(ranked_jobs_data)}")
 
 
         # Fetch batch
-        current_batch = ranked_jobs_data[count : count + 5]
+        current_batch = await run_blocking(ranked_jobs_data.slice, count, count + 5)
         print(f"DEBUG: Fetching jobs indices {count} to {count+5}. items: {current_batch}")
 
-        jobs_to_send_details = []
-        for item in current_batch:
-            job_id = item["id"]
-            score = item["score"]
-            
-            job_doc = db.collection("resumes").document(job_id).get()
-            if job_doc.exists:
-                job_data = job_doc.to_dict()
-                # Filter fields
-                job_data = {key: job_data.get(key, "") for key in ["apply_options", "company_name", "description", "detected_extensions", "extensions", "job_highlights", "location", "title"]}
-                job_data["id"] = job_id
-                job_data["score"] = score # Real score from ranking
-                jobs_to_send_details.append(job_data)
-            else:
-                print(f"DEBUG: Job ID {job_id} not found in 'resumes' collection.")
+        # One batched read for the whole page of cards
+        scores = {item["id"]: item["score"] for item in current_batch}
+        jobs_to_send_details, missing = await run_blocking(load_job_cards, db, [item["id"] for item in current_batch])
+        for job_data in jobs_to_send_details:
+            job_data["score"] = scores[job_data["id"]] # Real score from ranking
+        if missing:
+            print(f"DEBUG: Job IDs {missing} not found in 'resumes' collection.")
  
         print(f"DEBUG: Successfully fetched {len(jobs_to_send_details)} job details.")
 
-        # Update count so WS starts from the next batch
-        if jobs_to_send_details:
-             db.collection("users").document(user["uid"]).update({
-                "count": count + len(jobs_to_send_details)
-             })
+        # Move the cursor so WS starts from the next batch (missing jobs are skipped, not retried).
+        # Flushed right away, together with any buffered swipes, since the socket may land on another instance.
+        if current_batch:
+            cursor_buffer.advance(user["uid"], count + len(current_batch), epoch, [item["id"] for item in current_batch])
+            await run_blocking(cursor_buffer.flush, user["uid"])
              
         return {
             "success": True,
             "ranked_jobs": jobs_to_send_details,
-            "total_jobs": len(ranked_jobs_data)
+            "total_jobs": len(ranked_jobs_data),
+            "ranking_status": ranking_status or READY
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/ranking-status")
+async def get_ranking_status(user: dict = Depends(get_current_user)):
+    """Poll whether the background ranking for the current user is done (from any worker)."""
+    user_doc = await run_blocking(db.collection("users").document(user["uid"]).get, field_paths=[STATUS_FIELD, "ranking_updated_at"])
+    user_data = user_doc.to_dict() if user_doc.exists else {}
+    status = ranking_queue.status(user["uid"], user_data)
+    if status is None:
+        # Ranked before statuses were stored
+        ranked = user_data.get("ranking_updated_at") is not None
+        status = {"status": READY if ranked else None, "updated_at": None, "error": None}
+    return {"success": True, **status}
    
 @app.websocket("/ws/jobs")
 async def jobs_ws(ws: WebSocket):
     await ws.accept()
+    upcoming = None
+    uid = None
 
     try:
         token = ws.query_params.get("token")
@@ -319,45 +415,48 @@ async def jobs_ws(ws: WebSocket):
             await ws.close(code=1008)
             return
 
-        decoded = auth.verify_id_token(token)
+        decoded = await run_blocking(auth.verify_id_token, token)
         uid = decoded["uid"]
 
         # 2. Load user state (example)
         user_ref = db.collection("users").document(uid)
-        user = user_ref.get().to_dict()
+        user = (await run_blocking(user_ref.get)).to_dict()
+
+        ranked_jobs_data = FeedReader(db, uid, user) # {id, score} entries, one page read at a time
+        epoch = user.get("updated_at")
+        count = cursor_buffer.current(uid, user.get("count", 0), epoch)
 
-        ranked_jobs_data = user.get("ranked_jobs", []) # List of {id, score}
-        count = user.get("count", 0)
+        # Keep the next WS_PREFETCH_DEPTH cards in memory, refilled in the background while the user swipes
+        upcoming = CardPrefetcher(db, ranked_jobs_data, count, lambda: FeedReader(db, uid, user_ref.get().to_dict()))
+        upcoming.start()
 
         while True:
             data = json.loads(await ws.receive_text())
 
             if data["type"] == "NEXT_JOB":
-                if count >= len(ranked_jobs_data):
+                next_card = await upcoming.next()
+                if next_card is None:
                     await ws.send_json({ "type": "END" })
                     continue
 
-                item = ranked_jobs_data[count]
-                job_id = item["id"]
-                score = item["score"]
-                count += 1
-
-                doc = db.collection("resumes").document(job_id).get()
-                if doc.exists:
-                    job_data = doc.to_dict()
-                    job_data = {key: job_data.get(key, "") for key in ["apply_options", "company_name", "description", "detected_extensions", "extensions", "job_highlights", "location", "title"]}
-                    job_data["id"] = job_id
-                    job_data["score"] = score # Send real score
-                    
-                    await ws.send_json({
-                        "type": "JOB",
-                        "job": job_data
-                    })
+                position, job_data = next_card
+                count = position + 1
+
+                await ws.send_json({
+                    "type": "JOB",
+                    "job": job_data,
+                    "position": position
+                })
 
-                user_ref.update({"count": count})
+                cursor_buffer.advance(uid, count, epoch, [job_data["id"]])
 
     except WebSocketDisconnect:
         print("Client disconnected")
+    finally:
+        if upcoming is not None:
+            upcoming.close()
+        if uid is not None:
+            await run_blocking(cursor_buffer.flush, uid)
 
 
 @app.websocket("/ws/apply")
@@ -380,7 +479,7 @@ async def apply_ws(ws: WebSocket):
             
         # 1. Authenticate user
         try:
-            decoded = auth.verify_id_token(token)
+            decoded = await run_blocking(auth.verify_id_token, token)
             uid = decoded["uid"]
         except Exception:
             await ws.send_json({"type": "error", "message": "Invalid token"})
@@ -389,14 +488,13 @@ async def apply_ws(ws: WebSocket):
             
         await ws.send_json({"type": "status", "message": "Authenticated. Fetching job details..."})
         
-        # 2. Fetch Job Details from Firestore
-        job_doc = db.collection("resumes").document(job_id).get()
-        if not job_doc.exists:
+        # 2. Fetch Job Details (card cache, falling back to Firestore)
+        job_data = await run_blocking(job_card_cache.get, db, job_id)
+        if job_data is None:
             await ws.send_json({"type": "error", "message": "Job not found"})
             await ws.close()
             return
             
-        job_data = job_doc.to_dict()
         title = job_data.get("title", "Job")
         company = job_data.get("company_name", "Company")
         
@@ -417,7 +515,7 @@ async def apply_ws(ws: WebSocket):
         
         # 3. Update match status in Firestore to "applying"
         match_ref = db.collection("users").document(uid).collection("matches").document(job_id)
-        match_ref.set({"status": "applying", "title": title, "company_name": company}, merge=True)
+        await run_blocking(mark_applying, db, uid, job_id, job_data)
         
         # 4. Start the automation process as a separate OS process
         import subprocess
@@ -479,7 +577,7 @@ async def apply_ws(ws: WebSocket):
                         print("Received abort command. Terminating agent subprocess...")
                         process.kill()
                         if match_ref:
-                            match_ref.update({
+                            await run_blocking(match_ref.update, {
                                 "status": "failed",
                                 "failure_reason": "Aborted by user"
                             })
@@ -503,14 +601,14 @@ async def apply_ws(ws: WebSocket):
                     # Persist status in Firestore
                     if msg.get("type") == "success":
                         if match_ref:
-                            match_ref.update({
+                            await run_blocking(match_ref.update, {
                                 "status": "applied",
                                 "applied_at": firestore.SERVER_TIMESTAMP,
                                 "application_result": msg.get("result")
                             })
                     elif msg.get("type") == "error":
                         if match_ref:
-                            match_ref.update({
+                            await run_blocking(match_ref.update, {
                                 "status": "failed",
                                 "failure_reason": msg.get("message")
                             })
@@ -525,9 +623,9 @@ async def apply_ws(ws: WebSocket):
             process.kill()
         try:
             if match_ref:
-                doc = match_ref.get()
+                doc = await run_blocking(match_ref.get)
                 if doc.exists and doc.to_dict().get("status") == "applying":
-                    match_ref.update({"status": "saved"})
+                    await run_blocking(match_ref.update, {"status": "saved"})
         except Exception:
             pass
             
@@ -538,7 +636,7 @@ async def apply_ws(ws: WebSocket):
         try:
             await ws.send_json({"type": "error", "message": f"Application failed: {str(e)}"})
             if match_ref:
-                match_ref.update({
+                await run_blocking(match_ref.update, {
                     "status": "failed",
                     "failure_reason": str(e)
                 })
@@ -563,55 +661,66 @@ async def get_live_screenshot(uid: str):
     raise HTTPException(status_code=404, detail="Live screenshot not found")
 
 @app.post("/parse-resume")
-async def parse_resume(file: UploadFile = File(...),user: dict = Depends(get_current_user)):
+async def parse_resume(request: Request, user: dict = Depends(get_current_user)):
     """
-    Upload a resume PDF and get parsed info_dict and job_dict.
+    Upload a resume PDF or DOCX (multipart/form-data field "file") and get parsed info_dict and
+    job_dict. The body is parsed as it arrives; the file type is taken from the bytes, not the filename.
     """
-    # Validate file type
-    if not file.filename.lower().endswith(('.pdf', '.docx')):
-        raise HTTPException(status_code=400, detail="Only PDF and DOCX files are supported")
-    
-    # Save uploaded file temporarily
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-        content = await file.read()
-        tmp_file.write(content)
-        tmp_path = tmp_file.name
+    # Stream the upload next to its final location (size and type checked on the way)
+    resumes_dir = os.path.join(os.path.dirname(__file__), "resumes")
+    try:
+        tmp_path, digest = await receive_upload(request, resumes_dir)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (UnsupportedDocument, MalformedUpload) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     try:
-        # Extract text from PDF
-        raw_text = extract_text_from_pdf(tmp_path)
+        # Extract text (validates the file type)
+        kind, raw_text = await cached_resume_text(tmp_path, digest)
         
         if not raw_text.strip():
-            raise HTTPException(status_code=400, detail="Could not extract text from PDF")
+            raise HTTPException(status_code=400, detail=f"Could not extract text from {kind.upper()}")
         
         # Parse with LLM
-        parsed_data = parse_resume_with_llm(raw_text)
+        parsed_data = await run_blocking(cached_resume_parse, digest, raw_text)
         
         # Get both info_dict and job_dict
         info_dict = parsed_data.get("info_dict", {})
         job_dict = parsed_data.get("job_dict", {})
         new_keys_tracker = parsed_data.get("new_keys_tracker", {})
 
-        # Save resume persistently for the auto-apply agent
-        import shutil
-        resumes_dir = os.path.join(os.path.dirname(__file__), "resumes")
-        os.makedirs(resumes_dir, exist_ok=True)
-        ext = os.path.splitext(file.filename)[1].lower()
-        persistent_pdf_path = os.path.join(resumes_dir, f"{user['uid']}{ext}")
-        shutil.copy(tmp_path, persistent_pdf_path)
+        # Save resume persistently for the auto-apply agent (atomic rename, no copy)
+        persistent_pdf_path = os.path.join(resumes_dir, f"{user['uid']}.{kind}")
+        await run_blocking(os.replace, tmp_path, persistent_pdf_path)
+        # Drop a copy of the other type left by an earlier upload, so the agent finds this one
+        stale_path = os.path.join(resumes_dir, f"{user['uid']}.{'docx' if kind == 'pdf' else 'pdf'}")
+        if os.path.exists(stale_path):
+            os.unlink(stale_path)
 
         # FORCE OVERWRITE: Reset user data completely
-        db.collection("users").document(user["uid"]).set(
+        # Jobs shown from the old feed stay excluded from the new one
+        await run_blocking(cursor_buffer.flush, user["uid"])
+        await run_blocking(carry_seen, db, user["uid"])
+        # Job filters are the user's preferences, not resume data, so they survive the reset too
+        kept = await run_blocking(db.collection("users").document(user["uid"]).get, field_paths=["job_filters"])
+        job_filters = kept.to_dict().get("job_filters") if kept.exists else None
+        await run_blocking(clear_feed, db, user["uid"])
+        await run_blocking(
+            db.collection("users").document(user["uid"]).set,
             {
                 "info_dict": info_dict,
                 "job_dict": job_dict,
                 "dynamic_keys": new_keys_tracker,
                 "count": 0,
-                "ranked_jobs": [], # Clear old rankings
                 "updated_at": firestore.SERVER_TIMESTAMP,
+                **({"job_filters": job_filters} if job_filters else {}),
             },
             merge=False, # ❌ CRITICAL: Overwrite previous data
         )
+
+        # Rank in the background; clients poll /ranking-status or wait in /save-profile
+        ranking_queue.submit(user["uid"])
         
         return {
             "success": True,
@@ -623,6 +732,8 @@ async def parse_resume(file: UploadFile = File(...),user: dict = Depends(get_cur
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -630,9 +741,6 @@ async def parse_resume(file: UploadFile = File(...),user: dict = Depends(get_cur
         # Clean up temp file
         if os.path.exists(tmp_path):
             os.unlink(tmp_path)
-
-        # Compute and store ranking
-        compute_and_store_ranking(user["uid"])
     
 
 @app.get("/debug/ranked_jobs")
@@ -641,18 +749,23 @@ async def debug_ranked_jobs(user: dict = Depends(get_current_user)):
     This is protected by the same auth used elsewhere and is intended for debugging only.
     """
     try:
-        user_doc = db.collection("users").document(user["uid"]).get()
+        user_doc = await run_blocking(db.collection("users").document(user["uid"]).get)
         if not user_doc.exists:
             raise HTTPException(status_code=404, detail="User data not found")
 
-        job_dict = user_doc.to_dict().get("job_dict", {})
-        database = load_job_database()
+        user_data = user_doc.to_dict()
+        job_dict = user_data.get("job_dict", {})
+        database = await run_blocking(load_job_index)
+
+        query_embedding, embedding_updates = await run_blocking(query_embedding_for, job_dict, user_data, create_embedding)
+        if embedding_updates:
+            await run_blocking(db.collection("users").document(user["uid"]).update, embedding_updates)
 
         # Compute ranking (in-memory, do not store)
-        ranked = rank_jobs_by_similarity(job_dict, database, top_k=50)
+        ranked = await run_blocking(rank_jobs_by_similarity, job_dict, database, top_k=50, query_embedding=query_embedding, filters=user_data.get("job_filters"))
 
         # Provide a sample mapping of doc ids -> titles from the DB to inspect whether doc ids are titles
-        db_sample = [{"doc_id": d.get("id"), "title": d.get("title")} for d in database[:50]]
+        db_sample = [{"doc_id": d.get("id"), "title": d.get("title")} for d in database.metadata[:50]]
 
         return {
             "success": True,
@@ -666,14 +779,16 @@ async def debug_ranked_jobs(user: dict = Depends(get_current_user)):
 @app.get("/me")
 async def get_my_profile(user: dict = Depends(get_current_user)):
     try:
-        doc = db.collection("users").document(user["uid"]).get()
+        doc = await run_blocking(db.collection("users").document(user["uid"]).get)
 
         if not doc.exists:
             raise HTTPException(status_code=404, detail="User data not found")
 
+        # Internal fields: a packed seen set (bytes, not JSON-encodable) and the query vector
+        data = {key: value for key, value in doc.to_dict().items() if key not in PRIVATE_USER_FIELDS}
         return {
             "success": True,
-            "data": doc.to_dict()
+            "data": data
         }
     except ResourceExhausted:
         raise HTTPException(
@@ -687,7 +802,7 @@ async def get_my_profile(user: dict = Depends(get_current_user)):
 @app.post("/match")
 async def save_match(match_data: dict, user: dict = Depends(get_current_user)):
     """
-    Save a job as a match for the user.
+    Save a job as a match for the user, with a snapshot of its card for /matches.
     """
     try:
         job_id = match_data.get("job_id")
@@ -695,49 +810,99 @@ async def save_match(match_data: dict, user: dict = Depends(get_current_user)):
         if not job_id:
             raise HTTPException(status_code=400, detail="job_id is required")
 
-        # Save to 'matches' subcollection
         # Structure: users/{uid}/matches/{job_id}
-        db.collection("users").document(user["uid"]).collection("matches").document(job_id).set({
-            "job_id": job_id,
-            "score": score,
-            "matched_at": firestore.SERVER_TIMESTAMP,
-            "status": "saved" 
-        })
-        
+        if not await run_blocking(record_match, db, user["uid"], job_id, score):
+            raise HTTPException(status_code=404, detail="Job not found")
+
         return {"success": True}
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error saving match: {e}")
         raise HTTPException(status_code=500, detail="Failed to save match")
 
+class SwipeEvent(BaseModel):
+    job_id: str
+    action: str  # "match" or "skip"
+    position: Optional[int] = None  # feed position, as sent with the card over /ws/jobs
+
+
+class SwipeBatch(BaseModel):
+    events: List[SwipeEvent]
+
+
+@app.post("/swipes")
+async def save_swipes(batch: SwipeBatch, user: dict = Depends(get_current_user)):
+    """
+    Record many match/skip events at once (fast swipers, replayed offline queues). Events are
+    checked against the user's ranked feed; matches and the advanced feed cursor are written
+    in one commit. Returns one result per event, in order.
+    """
+    if len(batch.events) > MAX_SWIPE_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_SWIPE_BATCH} events per batch")
+    try:
+        user_doc = await run_blocking(db.collection("users").document(user["uid"]).get)
+        if not user_doc.exists:
+            raise HTTPException(status_code=404, detail="User data not found")
+        user_data = user_doc.to_dict()
+        cursor = cursor_buffer.current(user["uid"], user_data.get("count", 0), user_data.get("updated_at"))
+        results, count = await run_blocking(apply_swipes, db, user["uid"], user_data, [event.model_dump() for event in batch.events], cursor)
+        return {"success": True, "results": results, "count": count}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error saving swipes: {e}")
+        raise HTTPException(status_code=500, detail="Failed to save swipes")
+
 @app.get("/matches")
-async def get_matches(user: dict = Depends(get_current_user)):
+async def get_matches(user: dict = Depends(get_current_user), limit: int = MATCHES_PAGE_SIZE, cursor: Optional[str] = None):
     """
-    Get all saved matches for the user.
+    Saved matches, newest first, one page per call. Pass next_cursor back as cursor for the next page.
     """
     try:
-        matches_ref = db.collection("users").document(user["uid"]).collection("matches").stream()
-        matches = []
-        
-        for doc in matches_ref:
-            match_data = doc.to_dict()
-            job_id = match_data.get("job_id")
-            saved_score = match_data.get("score", 0)
-            
-            # Fetch job details
-            job_doc = db.collection("resumes").document(job_id).get()
-            if job_doc.exists:
-                job_data = job_doc.to_dict()
-                job_data = {key: job_data.get(key, "") for key in ["apply_options", "company_name", "description", "detected_extensions", "extensions", "job_highlights", "location", "title"]}
-                job_data["id"] = job_id
-                job_data["score"] = saved_score  # Include the saved score
-                job_data["matched_at"] = match_data.get("matched_at")
-                matches.append(job_data)
-        
-        return {"success": True, "matches": matches}
+        matches, next_cursor = await run_blocking(list_matches, db, user["uid"], limit, cursor)
+        return {"success": True, "matches": matches, "next_cursor": next_cursor}
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     except Exception as e:
         print(f"Error fetching matches: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch matches")
 
+@app.delete("/match/{job_id}")
+async def delete_match(job_id: str, user: dict = Depends(get_current_user)):
+    try:
+        await run_blocking(db.collection("users").document(user["uid"]).collection("matches").document(job_id).delete)
+        return {"success": True}
+    except Exception as e:
+        print(f"Error deleting match: {e}")
+        raise HTTPException(status_code=500, detail="Failed to delete match")
+
+@app.delete("/matches")
+async def clear_all_matches(user: dict = Depends(get_current_user)):
+    try:
+        deleted = await run_blocking(clear_matches, db, user["uid"])
+        return {"success": True, "deleted": deleted}
+    except Exception as e:
+        print(f"Error clearing matches: {e}")
+        raise HTTPException(status_code=500, detail="Failed to clear matches")
+
+
+@app.get("/job/{job_id}/description")
+async def get_job_description(job_id: str, user: dict = Depends(get_current_user)):
+    """
+    Full description of a job. Cards carry a preview; the details view fetches the rest on open.
+    """
+    try:
+        description = await run_blocking(load_description, db, job_id)
+        if description is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return {"success": True, "job_id": job_id, "description": description}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error fetching description for {job_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch job description")
+
 
 class ChatRequest(BaseModel):
     message: str
@@ -770,7 +935,7 @@ async def chat_with_job(request: ChatRequest, user: dict = Depends(get_current_u
     """
     try:
         # Get user's resume data
-        user_doc = db.collection("users").document(user["uid"]).get()
+        user_doc = await run_blocking(db.collection("users").document(user["uid"]).get)
         if not user_doc.exists:
             raise HTTPException(status_code=404, detail="User data not found")
         
@@ -778,12 +943,11 @@ async def chat_with_job(request: ChatRequest, user: dict = Depends(get_current_u
         info_dict = user_data.get("info_dict", {})
         job_dict = user_data.get("job_dict", {})
         
-        # Get current job details
-        job_doc = db.collection("resumes").document(request.job_id).get()
-        if not job_doc.exists:
+        # Get current job details (usually already cached from the feed)
+        job_data = await run_blocking(job_card_cache.get, db, request.job_id)
+        if job_data is None:
             raise HTTPException(status_code=404, detail="Job not found")
-        
-        job_data = job_doc.to_dict()
+        description = await run_blocking(load_description, db, request.job_id, job_data)
         
         # Build context
         resume_context = f"""
@@ -801,7 +965,7 @@ CURRENT JOB:
 Title: {job_data.get('title', 'Unknown')}
 Company: {job_data.get('company_name', 'Unknown')}
 Location: {job_data.get('location', 'N/A')}
-Description: {job_data.get('description', 'No description')[:3000]}
+Description: {(description or 'No description')[:3000]}
 Requirements: {json.dumps(job_data.get('job_highlights', []), indent=2)}
 Tags: {json.dumps(job_data.get('extensions', []), indent=2)}
 """
@@ -820,12 +984,13 @@ Provide a helpful, concise response:"""
         async def generate():
             client = genai.Client()
             try:
-                response = client.models.generate_content_stream(
+                response = await run_blocking(
+                    client.models.generate_content_stream,
                     model="gemini-3-flash-preview",
                     contents=full_prompt,
                 )
                 
-                for chunk in response:
+                async for chunk in iterate_blocking(response):
                     if chunk.text:
                         # SSE format
                         yield f"data: {json.dumps({'text': chunk.text})}\n\n"
@@ -854,5 +1019,11 @@ Provide a helpful, concise response:"""
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy"}
+    return {"status": "healthy", "job_card_cache": job_card_cache.stats(), "ws_prefetch": prefetch_metrics.stats(), "cursor_buffer": cursor_buffer.stats()}
+
+
+@app.on_event("shutdown")
+def flush_cursors():
+    """Persist any buffered swipe cursors before the process exits."""
+    cursor_buffer.flush_all()
 
@@ -0,0 +1,82 @@
+import os
+from typing import Dict, List, Tuple
+
+from feed_cursor import advance_cursor
+from job_cards import load_job_cards
+from matches import match_document
+from ranked_feed import FeedReader
+
+SWIPE_ACTIONS = ("match", "skip")
+# One transaction carries every match write plus the cursor update (Firestore allows 500 writes)
+MAX_SWIPE_BATCH = int(os.getenv("MAX_SWIPE_BATCH", "200"))
+# Events without a position are looked up this far either side of the user's cursor, and no
+# event may lie further than this ahead of it (the cards cannot have been served yet)
+SWIPE_VALIDATION_WINDOW = int(os.getenv("SWIPE_VALIDATION_WINDOW", "250"))
+
+
+def locate_in_feed(feed: FeedReader, cursor: int, events: List[dict]) -> Dict[str, Tuple[int, float]]:
+    """
+    Feed position and score of each swiped job. A client-reported position is checked
+    exactly; anything else is searched for around the cursor.
+    """
+    found: Dict[str, Tuple[int, float]] = {}
+    limit = min(len(feed), cursor + SWIPE_VALIDATION_WINDOW)
+    for event in events:
+        position = event.get("position")
+        if isinstance(position, int) and 0 <= position < limit:
+            item = feed.get(position)
+            if item is not None and item["id"] == event["job_id"]:
+                found[item["id"]] = (position, item["score"])
+    wanted = {event["job_id"] for event in events} - set(found)
+    if wanted:
+        start = max(0, cursor - SWIPE_VALIDATION_WINDOW)
+        for offset, item in enumerate(feed.slice(start, limit)):
+            if item["id"] in wanted and item["id"] not in found:
+                found[item["id"]] = (start + offset, item["score"])
+    return found
+
+
+def apply_swipes(db, uid: str, user_data: dict, events: List[dict], cursor: int) -> Tuple[List[dict], int]:
+    """
+    Validate a batch of match/skip events against the user's ranked feed and commit every
+    match together with the advanced feed cursor and the additions to the seen set in one
+    transaction. Returns a result per event (in order) and the cursor after the batch.
+    """
+    feed = FeedReader(db, uid, user_data)
+    valid = [event for event in events if event.get("action") in SWIPE_ACTIONS and event.get("job_id")]
+    positions = locate_in_feed(feed, cursor, valid)
+    matched = [event["job_id"] for event in valid if event["action"] == "match" and event["job_id"] in positions]
+    cards, _ = load_job_cards(db, matched)
+    cards_by_id = {card["id"]: card for card in cards}
+
+    matches = db.collection("users").document(uid).collection("matches")
+    results = []
+    writes = {}
+    furthest = None
+    for index, event in enumerate(events):
+        job_id = event.get("job_id")
+        result = {"index": index, "job_id": job_id, "action": event.get("action")}
+        results.append(result)
+        if event.get("action") not in SWIPE_ACTIONS or not job_id:
+            result.update(status="rejected", error="invalid event")
+            continue
+        if job_id not in positions:
+            result.update(status="rejected", error="not in feed")
+            continue
+        position, score = positions[job_id]
+        if event["action"] == "match":
+            if job_id not in cards_by_id:
+                result.update(status="rejected", error="job not found")
+                continue
+            writes[job_id] = (matches.document(job_id), match_document(job_id, cards_by_id[job_id], score))
+            result["status"] = "saved"
+        else:
+            result["status"] = "skipped"
+        result["position"] = position
+        furthest = max(furthest or 0, position + 1)
+
+    if furthest is None:
+        return results, cursor
+    swiped = [result["job_id"] for result in results if "position" in result]
+    advance_cursor(db, uid, furthest, user_data.get("updated_at"), list(writes.values()), seen=swiped)
+    return results, max(cursor, furthest)
@@ -0,0 +1,147 @@
+import os
+import uuid
+import hashlib
+from typing import Optional, Tuple
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from blocking_io import run_blocking
+from resume_text import UnsupportedDocument, sniff_head
+
+# Resume uploads are read straight from the request body and fed to a streaming multipart
+# parser: the file's bytes are hashed and written to disk UPLOAD_CHUNK_BYTES at a time as they
+# arrive, and the request is rejected as soon as it passes RESUME_MAX_BYTES or the file's
+# first bytes are neither a PDF nor a zip (DOCX). Nothing is spooled first, so memory per
+# upload is about one chunk whatever the file size.
+RESUME_MAX_BYTES = int(os.getenv("RESUME_MAX_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(256 * 1024)))
+# Multipart framing around the file, allowed on top of RESUME_MAX_BYTES in the request body
+MULTIPART_OVERHEAD = 16 * 1024
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class MalformedUpload(ValueError):
+    """Raised when a request body is not a multipart form carrying the expected file."""
+
+
+def declared_too_large(content_length: Optional[str]) -> bool:
+    """True if a request's Content-Length alone rules out a resume under RESUME_MAX_BYTES."""
+    try:
+        return int(content_length) > RESUME_MAX_BYTES + MULTIPART_OVERHEAD
+    except (TypeError, ValueError):
+        return False
+
+
+def _open_temp(directory: str):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f".upload-{uuid.uuid4().hex}.tmp")
+    return path, open(path, "wb")
+
+
+class _FilePart:
+    """Multipart parser callbacks that collect the bytes of the first file in form field `field`."""
+
+    def __init__(self, field: str):
+        self.field = field.encode("latin-1")
+        self.data = bytearray()  # received but not yet written
+        self.found = False
+        self.done = False
+        self._active = False
+        self._headers = {}
+        self._name = b""
+        self._value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field,
+            "on_header_value": self._header_value,
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        }
+
+    def _part_begin(self):
+        self._headers = {}
+
+    def _header_field(self, data: bytes, start: int, end: int):
+        self._name += data[start:end]
+
+    def _header_value(self, data: bytes, start: int, end: int):
+        self._value += data[start:end]
+
+    def _header_end(self):
+        self._headers[self._name.lower()] = self._value
+        self._name = self._value = b""
+
+    def _headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._active = not self.found and options.get(b"name") == self.field and b"filename" in options
+        self.found = self.found or self._active
+
+    def _part_data(self, data: bytes, start: int, end: int):
+        if self._active:
+            self.data += data[start:end]
+
+    def _part_end(self):
+        if self._active:
+            self.done = True
+            self._active = False
+
+
+async def receive_upload(request, directory: str, field: str = "file") -> Tuple[str, str]:
+    """
+    Stream the file in form field `field` of a multipart request into a temp file in directory
+    (the final file's directory, so it can be os.replace'd into place) as the body arrives;
+    returns (temp path, SHA-256 of the file's bytes). Raises UploadTooLarge, UnsupportedDocument
+    or MalformedUpload, leaving nothing behind.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise MalformedUpload("Expected a multipart/form-data upload")
+    part = _FilePart(field)
+    parser = MultipartParser(options[b"boundary"], part.callbacks())
+    path, out = await run_blocking(_open_temp, directory)
+    digest = hashlib.sha256()
+    received = 0
+    size = 0
+    try:
+        async for body in request.stream():
+            received += len(body)
+            if received > RESUME_MAX_BYTES + MULTIPART_OVERHEAD:
+                raise UploadTooLarge(f"Resume exceeds {RESUME_MAX_BYTES // (1024 * 1024)} MB")
+            try:
+                parser.write(body)
+            except ValueError as e:
+                raise MalformedUpload(f"Malformed multipart body: {e}")
+            if size + len(part.data) > RESUME_MAX_BYTES:
+                raise UploadTooLarge(f"Resume exceeds {RESUME_MAX_BYTES // (1024 * 1024)} MB")
+            # Write whole chunks only, so the first write holds enough bytes to sniff
+            if len(part.data) < UPLOAD_CHUNK_BYTES and not part.done:
+                continue
+            chunk = bytes(part.data)
+            part.data.clear()
+            if not chunk:
+                continue
+            if size == 0 and not sniff_head(chunk):
+                raise UnsupportedDocument("Only PDF and DOCX files are supported")
+            size += len(chunk)
+            digest.update(chunk)
+            await run_blocking(out.write, chunk)
+        if not part.done:
+            raise MalformedUpload(f"No complete file in form field '{field}'")
+        if size == 0:
+            raise UnsupportedDocument("Empty upload")
+        await run_blocking(out.close)
+        return path, digest.hexdigest()
+    except BaseException:
+        out.close()
+        os.unlink(path)
+        raise
@@ -13,6 +13,11 @@ base_dir = os.path.dirname(os.path.abspath(__file__))
 env_path = os.path.join(base_dir, '../backend/.env')
 load_dotenv(env_path)
 
+# Near-duplicate detection is shared with the API server
+sys.path.insert(0, os.path.join(base_dir, '../backend'))
+from near_duplicates import NearDuplicateIndex, minhash
+from job_cards import DETAILS_COLLECTION, VECTORS_COLLECTION, load_job_vectors, write_job
+
 # 2. Initialize Firebase Admin SDK using backend/firebase.json
 cred_path = os.path.join(base_dir, '../backend/firebase.json')
 if not firebase_admin._apps:
@@ -59,12 +64,62 @@ def fetch_jobs(query):
         print(f"Error fetching jobs for query '{query}': {e}")
         return []
 
-def check_job_exists(job_id):
-    if not job_id:
-        return False
-    # Check if this job_id is already in resumes collection
-    docs = db.collection("resumes").where("job_id", "==", job_id).limit(1).get()
-    return len(docs) > 0
+def load_existing_jobs():
+    """
+    Read the clustering fields of every stored job once per run. Returns the set of SerpApi
+    job_ids already stored and a NearDuplicateIndex over the canonical job of each cluster.
+    Jobs stored before clustering existed are assigned to clusters here (oldest first).
+    """
+    # "minhash" and "embedding" are only on cards stored before vectors moved to job_vectors
+    fields = ["job_id", "minhash", "embedding", "cluster_id", "is_canonical", "description", "description_truncated", "added_at"]
+    docs = [(doc.id, doc.to_dict()) for doc in db.collection("resumes").select(fields).stream()]
+    by_id = dict(docs)
+    vectors = load_job_vectors(db, [doc_id for doc_id, data in docs if "embedding" not in data or "minhash" not in data])
+    for doc_id, found in vectors.items():
+        by_id[doc_id].update(found)
+    # Jobs not yet clustered are hashed on their full description
+    unclustered = [doc_id for doc_id, data in docs if "cluster_id" not in data and data.get("description_truncated")]
+    for start in range(0, len(unclustered), 100):
+        refs = [db.collection(DETAILS_COLLECTION).document(doc_id) for doc_id in unclustered[start:start + 100]]
+        for doc in db.get_all(refs, field_paths=["description"]):
+            if doc.exists:
+                by_id[doc.id]["description"] = doc.to_dict().get("description", "")
+    epoch = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+    docs.sort(key=lambda item: item[1].get("added_at") or epoch)
+
+    existing_ids = set()
+    index = NearDuplicateIndex()
+    batch = db.batch()
+    backfilled = 0
+    for doc_id, data in docs:
+        if data.get("job_id"):
+            existing_ids.add(data["job_id"])
+
+        if "cluster_id" in data:
+            if data.get("is_canonical", True):
+                index.add(doc_id, data.get("minhash"), data.get("embedding"))
+            continue
+
+        signature = minhash(data.get("description", ""))
+        canonical = index.find(signature, data.get("embedding"))
+        if canonical is None:
+            index.add(doc_id, signature, data.get("embedding"))
+        batch.update(db.collection("resumes").document(doc_id), {
+            "cluster_id": canonical or doc_id,
+            "is_canonical": canonical is None,
+        })
+        batch.set(db.collection(VECTORS_COLLECTION).document(doc_id), {"minhash": signature}, merge=True)
+        backfilled += 1
+        if backfilled % 100 == 0:
+            batch.commit()
+            batch = db.batch()
+
+    if backfilled % 100 != 0:
+        batch.commit()
+    if backfilled:
+        print(f"Assigned clusters to {backfilled} previously stored job(s)")
+    print(f"Loaded {len(existing_ids)} existing job(s), {len(index)} canonical cluster(s)")
+    return existing_ids, index
 
 from google.genai import types
 
@@ -101,6 +156,8 @@ def main():
 
     total_added = 0
     total_skipped = 0
+    total_duplicates = 0
+    existing_ids, clusters = load_existing_jobs()
 
     for domain in DOMAINS:
         jobs = fetch_jobs(domain)
@@ -116,7 +173,7 @@ def main():
                 continue
 
             # De-duplicate check
-            if check_job_exists(job_id):
+            if job_id in existing_ids:
                 print(f"Job already exists (Skipping): '{title}' at '{company_name}' (ID: {job_id[:15]}...)")
                 total_skipped += 1
                 continue
@@ -128,6 +185,11 @@ def main():
                 print("Skipping job due to embedding generation failure.")
                 continue
 
+            # Near-duplicate check: same posting re-listed by another aggregator
+            signature = minhash(description)
+            canonical = clusters.find(signature, embedding)
+            doc_ref = db.collection("resumes").document()
+
             # Calculate dates
             now = datetime.datetime.now(datetime.timezone.utc)
             expiry = now + datetime.timedelta(days=30)  # 1 month expiry
@@ -146,20 +208,31 @@ def main():
                 "apply_options": job.get("apply_options", []),
                 "job_id": job_id,
                 "embedding": embedding,
+                "minhash": signature,
+                "cluster_id": canonical or doc_ref.id,
+                "is_canonical": canonical is None,
                 "added_at": now,
                 "expiry_date": expiry
             }
 
-            # Add to resumes collection
+            # Slim card in resumes, full description and vectors beside it, in one batch
             try:
-                db.collection("resumes").add(job_payload)
-                print(f"SUCCESS: Added job '{title}' at '{company_name}' (Expiry: {expiry.strftime('%Y-%m-%d')})")
+                batch = db.batch()
+                write_job(batch, db, doc_ref.id, job_payload)
+                batch.commit()
+                existing_ids.add(job_id)
+                if canonical is None:
+                    clusters.add(doc_ref.id, signature, embedding)
+                    print(f"SUCCESS: Added job '{title}' at '{company_name}' (Expiry: {expiry.strftime('%Y-%m-%d')})")
+                else:
+                    total_duplicates += 1
+                    print(f"Added near-duplicate of {canonical}: '{title}' at '{company_name}' (kept out of the ranking index)")
                 total_added += 1
             except Exception as e:
                 print(f"Error adding job to Firestore: {e}")
 
     print("="*60)
-    print(f"Cron Completed. Added: {total_added}, Skipped: {total_skipped}")
+    print(f"Cron Completed. Added: {total_added} ({total_duplicates} near-duplicates), Skipped: {total_skipped}")
     print("="*60)
 
 if __name__ == "__main__":
@@ -10,6 +10,10 @@ base_dir = os.path.dirname(os.path.abspath(__file__))
 env_path = os.path.join(base_dir, '../backend/.env')
 load_dotenv(env_path)
 
+# Card cache invalidation is shared with the API server
+sys.path.insert(0, os.path.join(base_dir, '../backend'))
+from job_cards import INVALIDATION_COLLECTION, delete_job, log_deleted_jobs
+
 # 2. Initialize Firebase Admin SDK using backend/firebase.json
 cred_path = os.path.join(base_dir, '../backend/firebase.json')
 if not firebase_admin._apps:
@@ -18,6 +22,48 @@ if not firebase_admin._apps:
     firebase_admin.initialize_app(cred)
 db = firestore.client()
 
+# Invalidation log entries older than this have been seen by every running server
+INVALIDATION_RETENTION = datetime.timedelta(days=7)
+
+def promote_cluster_survivors(expired_docs, now):
+    """
+    Only the canonical job of each near-duplicate cluster is ranked. When a canonical job
+    expires, promote the surviving duplicate that expires last so the posting stays visible.
+    """
+    deleted_ids = {doc.id for doc in expired_docs}
+    for doc in expired_docs:
+        job_data = doc.to_dict()
+        if not job_data.get("is_canonical") or not job_data.get("cluster_id"):
+            continue
+        members = [m for m in db.collection("resumes").where("cluster_id", "==", doc.id).stream() if m.id not in deleted_ids]
+        if not members:
+            continue
+        survivor = max(members, key=lambda m: m.to_dict().get("expiry_date") or now)
+        batch = db.batch()
+        for member in members:
+            update = {"cluster_id": survivor.id}
+            if member.id == survivor.id:
+                # added_at is the job index's sync watermark; bump it so the promoted job gets picked up
+                update.update({"is_canonical": True, "added_at": now})
+            batch.update(member.reference, update)
+        batch.commit()
+        print(f"Promoted {survivor.id} as canonical for expired cluster {doc.id} ({len(members)} member(s))")
+
+def prune_invalidation_log(now):
+    old = db.collection(INVALIDATION_COLLECTION).where("deleted_at", "<", now - INVALIDATION_RETENTION).stream()
+    batch = db.batch()
+    pruned = 0
+    for doc in old:
+        batch.delete(doc.reference)
+        pruned += 1
+        if pruned % 100 == 0:
+            batch.commit()
+            batch = db.batch()
+    if pruned % 100 != 0:
+        batch.commit()
+    if pruned:
+        print(f"Pruned {pruned} old cache invalidation record(s).")
+
 def main():
     print("="*60)
     print(f"Starting Job Deletion Cron at {datetime.datetime.now()}")
@@ -41,10 +87,11 @@ def main():
         expiry = job_data.get("expiry_date")
         
         print(f"Deleting expired job: '{title}' at '{company}' (Expired at: {expiry})")
-        batch.delete(doc.reference)
+        # Card, full description and vectors (3 writes per job)
+        delete_job(batch, db, doc.id)
         deleted_count += 1
 
-        # Commit batch every 100 deletions to stay safely below Firestore's 500 limit
+        # Commit batch every 100 jobs to stay safely below Firestore's 500 limit
         if deleted_count % 100 == 0:
             print("Committing batch delete...")
             batch.commit()
@@ -54,6 +101,13 @@ def main():
         print("Committing remaining deletions...")
         batch.commit()
 
+    # Tell the API servers' job card caches to drop the deleted jobs
+    if expired_docs:
+        log_deleted_jobs(db, [doc.id for doc in expired_docs])
+    prune_invalidation_log(now)
+
+    promote_cluster_survivors(expired_docs, now)
+
     print("="*60)
     print(f"Cron Completed. Deleted {deleted_count} expired job(s).")
     print("="*60)
@@ -0,0 +1,112 @@
+import os
+import sys
+import json
+import argparse
+import datetime
+import firebase_admin
+from firebase_admin import credentials, firestore
+from dotenv import load_dotenv
+
+# One-shot migration: split every "resumes" document written before the card/details/vectors
+# layout into a slim card, a job_details document and a job_vectors document. Safe to re-run;
+# already split jobs are skipped.
+
+# 1. Load environment variables from backend/.env
+base_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.join(base_dir, '../backend')
+load_dotenv(os.path.join(backend_dir, '.env'))
+
+sys.path.insert(0, backend_dir)
+from job_cards import CACHED_FIELDS, split_job, to_card, write_job
+
+# 2. Initialize Firebase Admin SDK using backend/firebase.json
+cred_path = os.path.join(backend_dir, 'firebase.json')
+if not firebase_admin._apps:
+    print(f"Initializing Firebase with certificate: {cred_path}")
+    cred = credentials.Certificate(cred_path)
+    firebase_admin.initialize_app(cred)
+db = firestore.client()
+
+JOBS_PER_BATCH = 100  # 3 writes per job, below Firestore's 500 per batch
+
+
+def value_size(value) -> int:
+    """Stored size of a Firestore value (https://firebase.google.com/docs/firestore/storage-size)."""
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float, datetime.datetime)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode("utf-8")) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(key.encode("utf-8")) + 1 + value_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(value_size(item) for item in value)
+    return 16  # references, geopoints
+
+
+def document_size(data: dict, fields=None) -> int:
+    """Payload of a read of data, optionally projected onto fields (document name excluded)."""
+    if fields is not None:
+        data = {key: data[key] for key in fields if key in data}
+    return 32 + value_size(data)
+
+
+def card_json_size(doc_id: str, data: dict) -> int:
+    """Bytes of the card JSON a swipe sends to the client."""
+    return len(json.dumps(to_card(doc_id, data), default=str).encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split job documents into card, details and vectors.")
+    parser.add_argument("--dry-run", action="store_true", help="only measure the bytes per swipe, write nothing")
+    args = parser.parse_args()
+
+    print("="*60)
+    print(f"Starting Job Card Migration at {datetime.datetime.now()}{' (dry run)' if args.dry_run else ''}")
+    print("="*60)
+
+    totals = {"full": 0, "card_before": 0, "card_after": 0, "json_before": 0, "json_after": 0}
+    migrated = 0
+    skipped = 0
+    batch = db.batch()
+    for doc in db.collection("resumes").stream():
+        data = doc.to_dict()
+        if "description_truncated" in data:
+            skipped += 1
+            continue
+        card, _, _ = split_job(data)
+        totals["full"] += document_size(data)
+        totals["card_before"] += document_size(data, CACHED_FIELDS)
+        totals["card_after"] += document_size(card, CACHED_FIELDS)
+        totals["json_before"] += card_json_size(doc.id, data)
+        totals["json_after"] += card_json_size(doc.id, card)
+        migrated += 1
+        if args.dry_run:
+            continue
+        write_job(batch, db, doc.id, data)
+        if migrated % JOBS_PER_BATCH == 0:
+            print(f"Committing batch ({migrated} job(s) so far)...")
+            batch.commit()
+            batch = db.batch()
+
+    if not args.dry_run and migrated % JOBS_PER_BATCH != 0:
+        batch.commit()
+
+    print("="*60)
+    print(f"Migration {'measured' if args.dry_run else 'completed'}: {migrated} job(s) split, {skipped} already split.")
+    if migrated:
+        per_job = {key: value / migrated for key, value in totals.items()}
+        print("Average bytes per swipe (one card):")
+        print(f"  full job document          {per_job['full']:10.0f}")
+        print(f"  card read, before          {per_job['card_before']:10.0f}")
+        print(f"  card read, after           {per_job['card_after']:10.0f}  ({1 - per_job['card_after'] / per_job['full']:.1%} below the full document)")
+        print(f"  card JSON to client, before {per_job['json_before']:9.0f}")
+        print(f"  card JSON to client, after  {per_job['json_after']:9.0f}  ({1 - per_job['json_after'] / per_job['json_before']:.1%} smaller)")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import os
+import sys
+import argparse
+import time
+import datetime
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from google import genai
+from google.genai import types
+import firebase_admin
+from firebase_admin import credentials, firestore
+from google.api_core.exceptions import FailedPrecondition
+from dotenv import load_dotenv
+
+# 1. Load environment variables from backend/.env
+base_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.join(base_dir, '../backend')
+env_path = os.path.join(backend_dir, '.env')
+load_dotenv(env_path)
+
+# Ranking code is shared with the API server
+sys.path.insert(0, backend_dir)
+from ranking import RANKED_FEED_SIZE, build_feed
+from job_snapshot import added_timestamps, get_snapshot, incremental_feed
+from query_embeddings import EMBEDDING_DIM, EMBEDDING_MODEL, query_embedding_for
+from job_filters import filtered_rows
+from ranked_feed import FeedReader, write_feed
+from seen_jobs import LEGACY_SEEN_FIELD, load_seen_many, merge_seen, seen_rows
+
+# 2. Initialize Firebase Admin SDK using backend/firebase.json
+cred_path = os.path.join(backend_dir, 'firebase.json')
+if not firebase_admin._apps:
+    print(f"Initializing Firebase with certificate: {cred_path}")
+    cred = credentials.Certificate(cred_path)
+    firebase_admin.initialize_app(cred)
+db = firestore.client()
+
+JOB_SNAPSHOT_DIR = os.getenv("JOB_SNAPSHOT_DIR", os.path.join(backend_dir, "job_snapshot"))
+
+# Users scored per matrix-matrix product, and users finished concurrently. Scoring runs on
+# the main thread; each user's Firestore work (reading the feed pages the new feed keeps,
+# then committing a dozen or so packed pages, the pointer and deletes of the previous pages,
+# guarded by the update time of the user document as it was read) runs on RERANK_WORKERS threads.
+SCORE_CHUNK_USERS = int(os.getenv("RERANK_CHUNK_USERS", "512"))
+USER_WORKERS = int(os.getenv("RERANK_WORKERS", "32"))
+
+
+def embed_profile(text):
+    """Embed a user's canonical job_dict text the same way the API server does."""
+    client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    response = client.models.embed_content(
+        model=EMBEDDING_MODEL,
+        contents=text,
+        config=types.EmbedContentConfig(output_dimensionality=EMBEDDING_DIM)
+    )
+    return response.embeddings[0].values
+
+
+def load_users(dim):
+    """
+    Return (uids, user_data, update times, query matrix) for every user with a profile. The
+    update time is the version of the user document the feed will be computed from.
+    """
+    uids, users, versions, vectors = [], [], [], []
+    fields = ["job_dict", "query_embedding", "query_embedding_hash", "ranked_feed", "ranked_jobs", "count", "ranked_through", "job_filters", LEGACY_SEEN_FIELD]
+    for doc in db.collection("users").select(fields).stream():
+        data = doc.to_dict()
+        if not data.get("job_dict"):
+            continue
+        # Only users whose stored vector is missing or stale (profile hash mismatch) cost a Gemini call
+        try:
+            embedding, embedding_updates = query_embedding_for(data["job_dict"], data, embed_profile)
+        except Exception as e:
+            print(f"Error generating profile embedding for user {doc.id}: {e}")
+            continue
+        version = doc.update_time
+        if embedding_updates:
+            version = db.collection("users").document(doc.id).update(embedding_updates).update_time
+        if len(embedding) != dim:
+            print(f"Skipping user {doc.id}: query embedding has {len(embedding)} dims, expected {dim}")
+            continue
+        uids.append(doc.id)
+        users.append(data)
+        versions.append(version)
+        vectors.append(embedding)
+    return uids, users, versions, np.asarray(vectors, dtype=np.float32).reshape(-1, dim)
+
+
+def load_seen_sets(uids, users):
+    """Each user's seen set (None if empty), read from the seen documents in batches."""
+    stored = load_seen_many(db, uids)
+    return [merge_seen(stored.get(uid), data.get(LEGACY_SEEN_FIELD)) or None for uid, data in zip(uids, users)]
+
+
+def shown_prefix(uid, data):
+    """The part of the stored feed the user has already been shown (only those pages are read)."""
+    count = data.get("count", 0)
+    return FeedReader(db, uid, data).slice(0, count), count
+
+
+def incremental_feeds(engine, uids, users, seen_sets, queries):
+    """
+    Per user, a callable returning their stored feed with only the jobs added since their last
+    ranking scored and merged in (it reads the whole stored feed, so it runs on a worker).
+    Users never ranked before get a full ranking instead.
+    """
+    stamps = added_timestamps(engine)
+    for uid, data, blob, query in zip(uids, users, seen_sets, queries):
+        allowed = filtered_rows(engine, data.get("job_filters"))
+        seen = seen_rows(engine, blob)
+        ranked_through = data.get("ranked_through")
+        if ranked_through is None:
+            hits = engine.search(query, RANKED_FEED_SIZE, rows=allowed, exclude=seen)
+            yield lambda uid=uid, data=data, hits=hits: build_feed(engine, hits, *shown_prefix(uid, data))
+            continue
+        yield lambda uid=uid, data=data, query=query, allowed=allowed, seen=seen, ranked_through=ranked_through: incremental_feed(
+            engine, query, FeedReader(db, uid, data).slice(0), data.get("count", 0), allowed, seen, ranked_through, stamps)
+
+
+def full_feeds(engine, uids, users, seen_sets, queries):
+    """
+    Unfiltered users are scored together with one matrix-matrix product per chunk; users
+    with job_filters are scored over their matching rows only. Yields, in user order, a
+    callable that reads the user's shown prefix and builds their feed (run on a worker).
+    Seen jobs are masked out of filtered searches; the batched product over-fetches by the
+    chunk's largest seen set (capped at one feed) and drops them afterwards.
+    """
+    for start in range(0, len(users), SCORE_CHUNK_USERS):
+        chunk_users = users[start:start + SCORE_CHUNK_USERS]
+        allowed = [filtered_rows(engine, data.get("job_filters")) for data in chunk_users]
+        seen = [seen_rows(engine, blob) for blob in seen_sets[start:start + SCORE_CHUNK_USERS]]
+        unfiltered = [offset for offset, rows in enumerate(allowed) if rows is None]
+        extra = min(RANKED_FEED_SIZE, max((len(seen[offset]) for offset in unfiltered if seen[offset] is not None), default=0))
+        batch_hits = engine.search_batch(queries[start + np.asarray(unfiltered, dtype=np.int64)], RANKED_FEED_SIZE + extra) if unfiltered else iter(())
+        for offset, data in enumerate(chunk_users):
+            if allowed[offset] is None:
+                hits = next(batch_hits)
+                if seen[offset] is not None:
+                    skip = set(seen[offset].tolist())
+                    hits = [hit for hit in hits if hit[0] not in skip]
+                hits = hits[:RANKED_FEED_SIZE]
+            else:
+                hits = engine.search(queries[start + offset], RANKED_FEED_SIZE, rows=allowed[offset], exclude=seen[offset])
+            yield lambda uid=uids[start + offset], data=data, hits=hits: build_feed(engine, hits, *shown_prefix(uid, data))
+
+
+def commit_feed(uid, data, version, ranked_jobs_data, ranked_through):
+    """
+    Write one user's feed unless their document changed since load_users read it (a resume
+    re-upload, a swipe, a filter change). Returns False for skipped users, who keep their
+    newer feed and are picked up by the next run.
+    """
+    try:
+        write_feed(db, uid, ranked_jobs_data, data.get("ranked_feed"), {
+            "ranking_updated_at": firestore.SERVER_TIMESTAMP,
+            "ranked_through": ranked_through,
+        }, option=db.write_option(last_update_time=version))
+        return True
+    except FailedPrecondition:
+        print(f"Skipping user {uid}: user document changed during the re-rank")
+        return False
+
+
+def rank_and_commit(uid, data, version, build, ranked_through):
+    """One user's Firestore work on a worker thread: build the feed (reading what it keeps) and commit it."""
+    return commit_feed(uid, data, version, build(), ranked_through)
+
+
+def main(incremental=False):
+    print("="*60)
+    print(f"Starting Batch Re-rank Cron at {datetime.datetime.now()}")
+    print("="*60)
+
+    started = time.perf_counter()
+    engine = get_snapshot(JOB_SNAPSHOT_DIR).sync(db)
+    print(f"Job index ready: {len(engine)} jobs")
+    if not len(engine):
+        print("No jobs to rank against. Exiting.")
+        return
+
+    uids, users, versions, queries = load_users(engine.dim)
+    print(f"Loaded {len(uids)} user query embeddings in {time.perf_counter() - started:.1f}s")
+
+    written = []
+    seen_sets = load_seen_sets(uids, users)
+    builders = incremental_feeds(engine, uids, users, seen_sets, queries) if incremental else full_feeds(engine, uids, users, seen_sets, queries)
+    with ThreadPoolExecutor(max_workers=USER_WORKERS) as pool:
+        pending = deque()  # bounded, so only a few feeds are held in memory at once
+        for uid, data, version, build in zip(uids, users, versions, builders):
+            pending.append(pool.submit(rank_and_commit, uid, data, version, build, engine.synced_through))
+            while len(pending) >= 2 * USER_WORKERS or (pending and pending[0].done()):
+                written.append(pending.popleft().result())
+        written.extend(future.result() for future in pending)
+
+    print("="*60)
+    print(f"Cron Completed. Re-ranked {sum(written)} user(s), skipped {len(written) - sum(written)} changed during the run, in {time.perf_counter() - started:.1f}s")
+    print("="*60)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-rank every user's job feed against the current job index.")
+    parser.add_argument("--incremental", action="store_true", help="only score jobs added since each user's last ranking")
+    args = parser.parse_args()
+    main(incremental=args.incremental)
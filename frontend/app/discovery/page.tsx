@@ -5,7 +5,7 @@ import { AnimatePresence, motion } from "framer-motion";
 import { JobCard } from "@/components/discovery/JobCard";
 import { JobDetailsModal } from "@/components/discovery/JobDetailsModal";
 import { JobChatbot } from "@/components/discovery/JobChatbot";
-import { DatabaseJob } from "@/lib/resumeApi";
+import { DatabaseJob, RankingStatus, fetchRankingStatus } from "@/lib/resumeApi";
 import { Briefcase, Heart, X, ChevronUp } from "lucide-react";
 import { Button } from "@/components/ui/button";
 import { useRouter } from "next/navigation";
@@ -17,6 +17,11 @@ type WSMessage =
   | { type: "END" };
 
 const BACKEND_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
+// A fresh upload is ranked in the background; poll until it settles, then load the feed
+const RANKING_POLL_MS = 2000;
+const RANKING_POLL_LIMIT_MS = 5 * 60 * 1000;
+
+const isRankingPending = (status: RankingStatus | undefined) => status === "queued" || status === "running";
 
 export default function DiscoveryPage() {
   const router = useRouter();
@@ -24,6 +29,8 @@ export default function DiscoveryPage() {
 
   const [jobs, setJobs] = useState<DatabaseJob[]>([]);
   const [loading, setLoading] = useState(true);
+  const [ranking, setRanking] = useState(false);
+  const mountedRef = useRef(true);
   const socketRef = useRef<WebSocket | null>(null);
   const isFetchingRef = useRef(false);
   const hasLoadedRef = useRef(false);
@@ -33,11 +40,40 @@ export default function DiscoveryPage() {
   const [exitDirection, setExitDirection] = useState<"left" | "right" | null>(null);
   const [pendingModalJob, setPendingModalJob] = useState<DatabaseJob | null>(null);
 
+  useEffect(() => {
+    mountedRef.current = true;
+    return () => {
+      mountedRef.current = false;
+    };
+  }, []);
+
   // Initial load
   useEffect(() => {
     if (hasLoadedRef.current) return;
     hasLoadedRef.current = true;
 
+    async function fetchFirstPage(token: string) {
+      const res = await fetch(`${BACKEND_URL}/save-profile`, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      return res.json();
+    }
+
+    async function waitForRanking() {
+      const deadline = Date.now() + RANKING_POLL_LIMIT_MS;
+      let status: RankingStatus = "queued";
+      while (isRankingPending(status) && Date.now() < deadline && mountedRef.current) {
+        await new Promise((resolve) => setTimeout(resolve, RANKING_POLL_MS));
+        const token = await getIdToken();
+        if (!token) return;
+        try {
+          status = (await fetchRankingStatus(token)).status;
+        } catch (error) {
+          console.error("Failed to poll ranking status:", error);
+        }
+      }
+    }
+
     async function loadInitialJobs() {
       const token = await getIdToken();
       if (!token) {
@@ -46,15 +82,22 @@ export default function DiscoveryPage() {
       }
 
       try {
-        const res = await fetch(`${BACKEND_URL}/save-profile`, {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-        const data = await res.json();
-        setJobs(data.ranked_jobs || []);
+        let data = await fetchFirstPage(token);
+        if (isRankingPending(data.ranking_status)) {
+          setRanking(true);
+          await waitForRanking();
+          const freshToken = await getIdToken();
+          if (!freshToken || !mountedRef.current) return;
+          data = await fetchFirstPage(freshToken);
+        }
+        if (mountedRef.current) setJobs(data.ranked_jobs || []);
       } catch (error) {
         console.error("Failed to load initial jobs:", error);
       } finally {
-        setLoading(false);
+        if (mountedRef.current) {
+          setRanking(false);
+          setLoading(false);
+        }
       }
     }
 
@@ -232,7 +275,9 @@ export default function DiscoveryPage() {
             <div className="absolute inset-0 border-4 border-primary/30 rounded-full animate-ping"></div>
             <div className="absolute inset-0 border-4 border-primary rounded-full border-t-transparent animate-spin"></div>
           </div>
-          <p className="text-muted-foreground font-medium animate-pulse">Loading your matches...</p>
+          <p className="text-muted-foreground font-medium animate-pulse">
+            {ranking ? "Ranking jobs for your resume..." : "Loading your matches..."}
+          </p>
         </div>
       </div>
     );
@@ -32,6 +32,8 @@ export default function MatchesPage() {
   const [loading, setLoading] = useState(true);
   const [selectedJob, setSelectedJob] = useState<DatabaseJob | null>(null);
   const [isModalOpen, setIsModalOpen] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // Fetch matches from Firebase via backend
   useEffect(() => {
@@ -52,6 +54,7 @@ export default function MatchesPage() {
         if (res.ok) {
           const data = await res.json();
           setMatches(data.matches || []);
+          setNextCursor(data.next_cursor || null);
         }
       } catch (error) {
         console.error("Failed to fetch matches:", error);
@@ -63,6 +66,26 @@ export default function MatchesPage() {
     fetchMatches();
   }, [getIdToken]);
 
+  const handleLoadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const token = await getIdToken();
+      const res = await fetch(`${BACKEND_URL}/matches?cursor=${encodeURIComponent(nextCursor)}`, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      if (res.ok) {
+        const data = await res.json();
+        setMatches((prev) => [...prev, ...(data.matches || [])]);
+        setNextCursor(data.next_cursor || null);
+      }
+    } catch (error) {
+      console.error("Failed to fetch more matches:", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleRemoveMatch = async (jobId: string, e: React.MouseEvent) => {
     e.stopPropagation();
     setMatches((prev) => prev.filter((job) => job.id !== jobId));
@@ -80,6 +103,7 @@ export default function MatchesPage() {
 
   const handleClearAll = async () => {
     setMatches([]);
+    setNextCursor(null);
 
     try {
       const token = await getIdToken();
@@ -221,6 +245,13 @@ export default function MatchesPage() {
                   </motion.div>
                 ))}
               </AnimatePresence>
+              {nextCursor && (
+                <div className="col-span-full flex justify-center">
+                  <Button variant="outline" onClick={handleLoadMore} disabled={loadingMore}>
+                    {loadingMore ? "Loading..." : "Load more"}
+                  </Button>
+                </div>
+              )}
             </div>
           ) : (
             <div className="text-center py-16">
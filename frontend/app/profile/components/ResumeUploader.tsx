@@ -55,7 +55,7 @@ export default function ResumeUploader({ onUploadComplete }: Props) {
             </div>
             <input
               type="file"
-              accept=".pdf,.doc,.docx"
+              accept=".pdf,.docx"
               className="hidden"
               onChange={(e) => setFile(e.target.files?.[0] || null)}
             />
@@ -11,8 +11,9 @@ import {
   Briefcase,
   Globe
 } from "lucide-react";
-import { DatabaseJob } from "@/lib/resumeApi";
-import { useState } from "react";
+import { DatabaseJob, fetchJobDescription } from "@/lib/resumeApi";
+import { useAuth } from "@/context/AuthContext";
+import { useEffect, useState } from "react";
 import { motion, AnimatePresence } from "framer-motion";
 
 interface ApplyOption {
@@ -36,6 +37,28 @@ export function JobDetailsModal({
   onPass
 }: JobDetailsModalProps) {
   const [showApplyOptions, setShowApplyOptions] = useState(false);
+  const [fullDescription, setFullDescription] = useState<string | null>(null);
+  const { getIdToken } = useAuth();
+
+  // Cards only carry a preview of long descriptions; load the rest when the modal opens
+  useEffect(() => {
+    setFullDescription(null);
+    if (!isOpen || !job?.id || !job.description_truncated) return;
+    let cancelled = false;
+    (async () => {
+      try {
+        const token = await getIdToken();
+        if (!token) return;
+        const description = await fetchJobDescription(job.id, token);
+        if (!cancelled) setFullDescription(description);
+      } catch (err) {
+        console.error("Failed to load job description", err);
+      }
+    })();
+    return () => {
+      cancelled = true;
+    };
+  }, [isOpen, job?.id, job?.description_truncated, getIdToken]);
 
   if (!job) return null;
 
@@ -53,7 +76,7 @@ export function JobDetailsModal({
 
   const companyLabel = job.company_name ?? "";
   const descriptionContent =
-    typeof job.description === "string" ? job.description : "";
+    fullDescription ?? (typeof job.description === "string" ? job.description : "");
 
   const tags: string[] = Array.isArray(job.extensions)
     ? job.extensions.filter((v) => typeof v === "string")
@@ -11,7 +11,8 @@ export interface DatabaseJob {
   company_name?: string;       // Firestore field
   location?: string;
   apply_options?: any[];
-  description?: string;        // Firestore field
+  description?: string;        // Firestore field (preview when description_truncated)
+  description_truncated?: boolean;
   score?: string;
   detected_extensions?: boolean[];   // Firestore field (array or string)
   extensions?: string[];            // Firestore field (object or array)
@@ -76,4 +77,41 @@ export async function fetchUserProfile(
     throw new Error(data.error || data.detail || "Failed to fetch user profile");
   }
   return data.data || {};
-}
\ No newline at end of file
+}
+
+export async function fetchJobDescription(
+  jobId: string,
+  token: string
+): Promise<string> {
+  const res = await fetch(`${BACKEND_URL}/job/${encodeURIComponent(jobId)}/description`, {
+    method: "GET",
+    headers: {
+      Authorization: `Bearer ${token}`,
+    },
+  });
+
+  const data = await res.json();
+  if (!res.ok) {
+    throw new Error(data.error || data.detail || "Failed to fetch job description");
+  }
+  return data.description || "";
+}
+
+export type RankingStatus = "queued" | "running" | "ready" | "failed" | null;
+
+export async function fetchRankingStatus(
+  token: string
+): Promise<{ status: RankingStatus; error?: string | null }> {
+  const res = await fetch(`${BACKEND_URL}/ranking-status`, {
+    method: "GET",
+    headers: {
+      Authorization: `Bearer ${token}`,
+    },
+  });
+
+  const data = await res.json();
+  if (!res.ok) {
+    throw new Error(data.error || data.detail || "Failed to fetch ranking status");
+  }
+  return { status: data.status ?? null, error: data.error };
+}